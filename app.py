@@ -6,6 +6,20 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 
+from utils import (
+    MEM_BUDGET_MB,
+    channel_summary,
+    filter_window,
+    load_cube,
+    load_master,
+    master_date_bounds,
+    mem_trace_peak,
+    mem_trace_start,
+    option_format,
+    taxonomy_index,
+    taxonomy_options,
+)
+
 # ✅ 클릭 이벤트(있으면 사용, 없으면 일반 차트)
 try:
     from streamlit_plotly_events import plotly_events
@@ -15,12 +29,11 @@ except Exception:
     HAS_PLOTLY_EVENTS = False
 
 st.set_page_config(page_title="VOC 대시보드", layout="wide")
+# rerun별 peak 메모리 측정 (VOC_TRACE_MEM=1 일 때만)
+mem_trace_start()
 
 BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, "data")
-MASTER_XLSX = os.path.join(DATA_DIR, "master.xlsx")
 
-REQUIRED_COLS = ["날짜", "기업명", "대분류", "중분류", "소분류", "채널"]
 CHANNELS = ["유선", "채팅", "게시판"]
 
 # ✅ 채널 색상(도넛/월별 누적)
@@ -35,9 +48,6 @@ CHART_H_TOP = 420
 CHART_H_BOTTOM = 420
 CHART_H_SECOND = 380
 
-# ✅ 상담 텍스트 후보 컬럼 (상담메모 우선)
-TEXT_CANDIDATES = ["상담메모", "상담내역", "문의내용", "상담내용", "VOC", "내용", "상세내용"]
-
 
 # -----------------------------
 # Helpers: 관리자 페이지 자동 탐색
@@ -422,40 +432,6 @@ div[data-testid="stVerticalBlock"]:has(.card-titlebar) div[data-testid="stPlotly
 )
 
 
-# -----------------------------
-# Data
-# -----------------------------
-def _must_cols(df: pd.DataFrame, cols):
-    miss = [c for c in cols if c not in df.columns]
-    if miss:
-        raise ValueError(f"master.xlsx에 필수 컬럼이 없습니다: {miss}")
-
-
-@st.cache_data(show_spinner=False)
-def load_master(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        return pd.DataFrame()
-
-    df = pd.read_excel(path)
-    df.columns = [str(c).strip() for c in df.columns]
-    _must_cols(df, REQUIRED_COLS)
-
-    df["날짜"] = pd.to_datetime(df["날짜"], errors="coerce")
-    df = df.dropna(subset=["날짜"]).copy()
-    df["월"] = df["날짜"].dt.to_period("M").dt.to_timestamp()
-
-    for c in ["기업명", "대분류", "중분류", "소분류", "채널"]:
-        df[c] = df[c].astype(str).str.strip()
-        df.loc[df[c].isin(["nan", "None", "NaN", ""]), c] = None
-
-    for c in TEXT_CANDIDATES:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
-            df.loc[df[c].isin(["nan", "None", "NaN", ""]), c] = None
-
-    return df
-
-
 def fmt_int(x):
     try:
         return f"{int(x):,}"
@@ -525,12 +501,23 @@ def clean_label(s: str) -> str:
     return str(s).replace("👑 ", "").strip()
 
 
+def count_by(df_: pd.DataFrame, col: str) -> pd.Series:
+    # 원본 행이면 value_counts, 집계 cube면 건수 합 (내림차순, 0건 제외)
+    if "건수" in df_.columns:
+        vc = df_.groupby(col, observed=True)["건수"].sum().sort_values(ascending=False)
+    else:
+        vc = df_[col].value_counts()
+    return vc[vc > 0]
+
+
 def top10_like(df_: pd.DataFrame, col: str, height: int, exclude_pattern: str | None = None):
-    s = df_[col].dropna().astype(str).str.strip()
+    # category code 기준 집계 후, 제외 패턴은 (행이 아닌) 집계된 라벨에만 적용
+    vc = count_by(df_, col)
     if exclude_pattern:
-        s = s[~s.str.contains(exclude_pattern, regex=True, na=False)]
-    top = s.value_counts().head(10).reset_index()
+        vc = vc[~vc.index.astype(str).str.contains(exclude_pattern, regex=True, na=False)]
+    top = vc.head(10).reset_index()
     top.columns = [col, "건수"]
+    top[col] = top[col].astype(str)
     if top.empty:
         st.info("데이터가 없어요.")
         return
@@ -560,80 +547,6 @@ def top10_like(df_: pd.DataFrame, col: str, height: int, exclude_pattern: str |
 # -----------------------------
 # ✅ 문의 요약 helpers
 # -----------------------------
-def detect_text_col(df_: pd.DataFrame) -> str | None:
-    for c in TEXT_CANDIDATES:
-        if c in df_.columns:
-            return c
-    return None
-
-
-def top_combo_text(df_: pd.DataFrame) -> tuple[str, int]:
-    if df_.empty:
-        return ("-", 0)
-
-    tmp = df_[["대분류", "중분류", "소분류"]].copy()
-    for c in ["대분류", "중분류", "소분류"]:
-        tmp[c] = tmp[c].fillna("미분류").astype(str).str.strip()
-        tmp.loc[tmp[c].isin(["", "nan", "None", "NaN"]), c] = "미분류"
-
-    tmp["조합"] = tmp["대분류"] + " > " + tmp["중분류"] + " > " + tmp["소분류"]
-    vc = tmp["조합"].value_counts()
-    if vc.empty:
-        return ("-", 0)
-    return vc.index[0], int(vc.iloc[0])
-
-
-def top_n_pairs(df_: pd.DataFrame, col: str, n: int = 2) -> list[tuple[str, int]]:
-    if df_.empty or col not in df_.columns:
-        return []
-
-    s = df_[col].dropna().astype(str).str.strip()
-    s = s[~s.isin(["", "nan", "None", "NaN", "미분류", "안내사항없음", "자체해결", "_자체해결"])]
-    if s.empty:
-        return []
-
-    vc = s.value_counts().head(n)
-    return [(str(idx), int(cnt)) for idx, cnt in vc.items()]
-
-
-def memo_keyword_hits(series: pd.Series, topn: int = 2) -> list[tuple[str, int]]:
-    if series is None or len(series) == 0:
-        return []
-
-    s = series.fillna("").astype(str)
-    s = s[s.str.strip() != ""]
-    if s.empty:
-        return []
-
-    keyword_groups = [
-        ("로그인", ["로그인", "로그인불가"]),
-        ("비밀번호", ["비밀번호", "패스워드", "임시비밀번호", "비번"]),
-        ("아이디", ["아이디"]),
-        ("수강신청", ["수강신청", "신청방법", "신청"]),
-        ("취소", ["취소", "수강취소"]),
-        ("환불", ["환불"]),
-        ("결제", ["결제", "자동결제"]),
-        ("진도", ["진도"]),
-        ("수료", ["수료", "수료증", "수료확정"]),
-        ("재생", ["재생", "영상", "동영상"]),
-        ("오류", ["오류", "에러", "장애", "불가"]),
-        ("출석", ["출석"]),
-        ("시험", ["시험", "평가"]),
-        ("모바일", ["모바일", "앱"]),
-    ]
-
-    hits = []
-    for label, kws in keyword_groups:
-        cnt = 0
-        for kw in kws:
-            cnt += int(s.str.contains(re.escape(kw), case=False, na=False).sum())
-        if cnt > 0:
-            hits.append((label, cnt))
-
-    hits = sorted(hits, key=lambda x: x[1], reverse=True)
-    return hits[:topn]
-
-
 # ✅ 요약 카드용 짧은 문구 생성
 def short_issue_sentences(
     channel_name: str,
@@ -711,7 +624,7 @@ def short_improvement_sentences(
     return dedup[:3]
 
 
-def render_summary_card(title: str, icon: str, channel_name: str, channel_df: pd.DataFrame, show_search_button: bool = False):
+def render_summary_card(title: str, icon: str, channel_name: str, summary: dict, show_search_button: bool = False):
     search_html = ""
     if show_search_button and SEARCH_PAGE:
         search_html = f'<a href="{SEARCH_PAGE_HREF}" target="_self" class="summary-link-btn">🔎 상담이력 검색</a>'
@@ -728,18 +641,14 @@ def render_summary_card(title: str, icon: str, channel_name: str, channel_df: pd
     st.markdown(header_html, unsafe_allow_html=True)
     st.markdown('<div class="card-line"></div>', unsafe_allow_html=True)
 
-    if channel_df.empty:
+    if not summary["rows"]:
         st.markdown('<div class="summary-empty">선택 조건에 해당하는 데이터가 없어요.</div>', unsafe_allow_html=True)
         return
 
-    top_combo, top_cnt = top_combo_text(channel_df)
-    mids_pairs = top_n_pairs(channel_df, "중분류", n=2)
-    smalls_pairs = top_n_pairs(channel_df, "소분류", n=2)
-
-    text_col = detect_text_col(channel_df)
-    memo_hits = []
-    if text_col:
-        memo_hits = memo_keyword_hits(channel_df[text_col], topn=2)
+    top_combo, top_cnt = summary["top_combo"], summary["top_cnt"]
+    mids_pairs = summary["mids"]
+    smalls_pairs = summary["smalls"]
+    memo_hits = summary["keywords"]
 
     issues = short_issue_sentences(channel_name, top_combo, top_cnt, mids_pairs, smalls_pairs, memo_hits)
     improvements = short_improvement_sentences(top_combo, mids_pairs, smalls_pairs, memo_hits)
@@ -777,13 +686,13 @@ st.markdown(
 # =============================
 # Load master
 # =============================
-df = load_master(MASTER_XLSX)
-if df.empty:
-    st.error("data/master.xlsx 를 찾을 수 없거나 데이터가 비어있어요.")
+bound_lo, bound_hi = master_date_bounds()
+if bound_lo is None or bound_hi is None:
+    st.error("data/master 를 찾을 수 없거나 데이터가 비어있어요.")
     st.stop()
 
-min_d = df["날짜"].min().date()
-max_d = df["날짜"].max().date()
+min_d = bound_lo.date()
+max_d = bound_hi.date()
 
 st.session_state.setdefault("big", "전체")
 st.session_state.setdefault("mid", "전체")
@@ -806,6 +715,16 @@ with c2:
     else:
         start_d, end_d = min_d, max_d
 
+start_dt = pd.to_datetime(start_d)
+end_dt = pd.to_datetime(end_d) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+# 프로세스 공용 master에서 선택 기간 구간만 view로 받는다 (페이지/세션 간 사본 공유)
+df = load_master(start_dt, end_dt)
+# 차트/KPI용 집계 cube (일 × 시간 × 채널 × 기업명 × 대/중/소 건수)
+cube = load_cube(start_dt, end_dt)
+if not len(df.columns):
+    st.error("data/master 를 찾을 수 없거나 데이터가 비어있어요.")
+    st.stop()
+
 with c3:
     companies = ["전체"] + sorted(df["기업명"].dropna().unique().tolist())
     f_company = st.selectbox("기업명", companies, index=0, key="company")
@@ -813,42 +732,41 @@ with c3:
 with c4:
     l1, l2, l3 = st.columns([1, 1, 1])
 
+    # 옵션/건수는 버전·기간별 분류 tree에서 바로 읽는다 (선택마다 master를 훑지 않음)
+    tree = taxonomy_index(start_dt, end_dt)
+
     with l1:
-        big_opts = ["전체"] + sorted(df["대분류"].dropna().unique().tolist())
+        big_counts = taxonomy_options(tree)
+        big_opts = ["전체"] + list(big_counts)
         big = st.selectbox(
             "대분류",
             big_opts,
             index=big_opts.index(st.session_state.get("big", "전체")) if st.session_state.get("big", "전체") in big_opts else 0,
+            format_func=option_format(big_counts),
             key="big_sel",
         )
 
-    if big != "전체":
-        mid_pool = df[df["대분류"] == big]["중분류"].dropna().unique().tolist()
-    else:
-        mid_pool = df["중분류"].dropna().unique().tolist()
-    mid_opts = ["전체"] + sorted(list(set(mid_pool)))
+    mid_counts = taxonomy_options(tree, big)
+    mid_opts = ["전체"] + list(mid_counts)
 
     with l2:
         mid = st.selectbox(
             "중분류",
             mid_opts,
             index=mid_opts.index(st.session_state.get("mid", "전체")) if st.session_state.get("mid", "전체") in mid_opts else 0,
+            format_func=option_format(mid_counts),
             key="mid_sel",
         )
 
-    small_df = df.copy()
-    if big != "전체":
-        small_df = small_df[small_df["대분류"] == big]
-    if mid != "전체":
-        small_df = small_df[small_df["중분류"] == mid]
-    small_pool = small_df["소분류"].dropna().unique().tolist()
-    small_opts = ["전체"] + sorted(list(set(small_pool)))
+    small_counts = taxonomy_options(tree, big, mid)
+    small_opts = ["전체"] + list(small_counts)
 
     with l3:
         small = st.selectbox(
             "소분류",
             small_opts,
             index=small_opts.index(st.session_state.get("small", "전체")) if st.session_state.get("small", "전체") in small_opts else 0,
+            format_func=option_format(small_counts),
             key="small_sel",
         )
 
@@ -862,37 +780,32 @@ st.markdown("</div>", unsafe_allow_html=True)
 # =============================
 # Apply Filters
 # =============================
-fdf = df.copy()
-start_dt = pd.to_datetime(start_d)
-end_dt = pd.to_datetime(end_d) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-fdf = fdf[(fdf["날짜"] >= start_dt) & (fdf["날짜"] <= end_dt)]
-
-if f_channel != "전체":
-    fdf = fdf[fdf["채널"] == f_channel]
-if f_company != "전체":
-    fdf = fdf[fdf["기업명"] == f_company]
-
+# 기간은 load 단계에서 이미 적용됨 (필요한 월 partition만 로드 + 날짜 구간 view)
 big = st.session_state.get("big", "전체")
 mid = st.session_state.get("mid", "전체")
 small = st.session_state.get("small", "전체")
 
-if big != "전체":
-    fdf = fdf[fdf["대분류"] == big]
-if mid != "전체":
-    fdf = fdf[fdf["중분류"] == mid]
-if small != "전체":
-    fdf = fdf[fdf["소분류"] == small]
+
+# 조건별 행 위치는 utils의 filter engine이 (버전, 기간, 조건) 단위로 캐시/재사용한다
+dim_selected = {"채널": f_channel, "기업명": f_company, "대분류": big, "중분류": mid, "소분류": small}
+
+# cube: KPI·차트용 (작은 집계표라 조건 결과만 꺼내 씀)
+base_cube, cube_idx = filter_window("cube", start_dt, end_dt, **dim_selected)
+fcube = base_cube.iloc[cube_idx]
+
+# 요약 카드 3개 재료는 한 번의 grouped pass로 (채널별 작은 결과 dict)
+summaries = channel_summary(start_dt, end_dt, topn=2, **dim_selected)
 
 
 # =============================
 # KPI
 # =============================
-total = len(fdf)
-by_ch = fdf["채널"].value_counts().to_dict()
-cnt_tel = by_ch.get("유선", 0)
-cnt_chat = by_ch.get("채팅", 0)
-cnt_board = by_ch.get("게시판", 0)
-corp_cnt = fdf["기업명"].nunique()
+total = int(fcube["건수"].sum())
+by_ch = count_by(fcube, "채널").to_dict()
+cnt_tel = int(by_ch.get("유선", 0))
+cnt_chat = int(by_ch.get("채팅", 0))
+cnt_board = int(by_ch.get("게시판", 0))
+corp_cnt = fcube["기업명"].nunique()
 
 k1, k2, k3, k4 = st.columns(4)
 with k1:
@@ -913,13 +826,13 @@ st.write("")
 s1, s2, s3 = st.columns(3)
 
 with s1:
-    render_summary_card("유선 문의 요약", "📞", "유선", fdf[fdf["채널"] == "유선"].copy(), show_search_button=True)
+    render_summary_card("유선 문의 요약", "📞", "유선", summaries["유선"], show_search_button=True)
 
 with s2:
-    render_summary_card("게시판 문의 요약", "📝", "게시판", fdf[fdf["채널"] == "게시판"].copy())
+    render_summary_card("게시판 문의 요약", "📝", "게시판", summaries["게시판"])
 
 with s3:
-    render_summary_card("채팅 문의 요약", "💬", "채팅", fdf[fdf["채널"] == "채팅"].copy())
+    render_summary_card("채팅 문의 요약", "💬", "채팅", summaries["채팅"])
 
 
 # =============================
@@ -930,10 +843,11 @@ a1, a2, a3 = st.columns(3)
 with a1:
     with st.container():
         card_title("📅", "월별 인입 추이")
-        if fdf.empty:
+        if fcube.empty:
             st.info("선택 조건에 해당하는 데이터가 없어요.")
         else:
-            g = fdf.groupby(["월", "채널"]).size().reset_index(name="건수")
+            g = fcube.groupby(["월", "채널"], observed=True)["건수"].sum().reset_index(name="건수")
+            g["채널"] = g["채널"].astype(str)
             wide = (
                 g.pivot_table(index="월", columns="채널", values="건수", aggfunc="sum", fill_value=0)
                 .reset_index()
@@ -962,14 +876,14 @@ with a1:
 with a2:
     with st.container():
         card_title("🗓️", "요일별 인입 추이")
-        if fdf.empty:
+        if fcube.empty:
             st.info("선택 조건에 해당하는 데이터가 없어요.")
         else:
             dow_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금", 5: "토", 6: "일"}
-            tmp = fdf.copy()
-            tmp["요일"] = tmp["날짜"].dt.weekday.map(dow_map)
             order = ["월", "화", "수", "목", "금", "토", "일"]
-            gd = tmp.groupby("요일").size().reindex(order, fill_value=0).reset_index()
+            gd = fcube.groupby("요일")["건수"].sum().reindex(range(7), fill_value=0)
+            gd.index = gd.index.map(dow_map)
+            gd = gd.reset_index()
             gd.columns = ["요일", "건수"]
             best = gd.loc[gd["건수"].idxmax()]
             chips([f"피크 요일 <span class='b'>{best['요일']}</span> · <span class='b'>{int(best['건수']):,}</span>건"])
@@ -983,13 +897,11 @@ with a2:
 with a3:
     with st.container():
         card_title("⏱️", "시간대별 인입 추이 (08~18시)")
-        if fdf.empty:
+        if fcube.empty:
             st.info("선택 조건에 해당하는 데이터가 없어요.")
         else:
-            tmp = fdf.copy()
-            tmp["시간"] = tmp["날짜"].dt.hour
             hours = list(range(8, 19))
-            gh = tmp.groupby("시간").size().reindex(hours, fill_value=0).reset_index()
+            gh = fcube.groupby("시간")["건수"].sum().reindex(hours, fill_value=0).reset_index()
             gh.columns = ["시간", "건수"]
             best = gh.loc[gh["건수"].idxmax()]
             chips([f"피크 시간 <span class='b'>{int(best['시간']):02d}시</span> · <span class='b'>{int(best['건수']):,}</span>건"])
@@ -1010,14 +922,10 @@ with b1:
         card_title("🏢", "문의 많은 기업 TOP 10")
 
         exclude_companies = {"알수없음", "(주)휴넷"}
-        top = (
-            fdf[~fdf["기업명"].isin(exclude_companies)]["기업명"]
-            .dropna()
-            .value_counts()
-            .head(10)
-            .reset_index()
-        )
+        top = count_by(fcube[~fcube["기업명"].isin(exclude_companies)], "기업명")
+        top = top.head(10).reset_index()
         top.columns = ["기업명", "건수"]
+        top["기업명"] = top["기업명"].astype(str)
 
         if top.empty:
             st.info("표시할 기업 데이터가 없어요.")
@@ -1123,22 +1031,28 @@ with b2:
 # =============================
 # Bottom: 대/중/소 TOP10
 # =============================
-EXCLUDE_PATTERN = r"(안내사항없음|자체해결|_자체해결)"
+EXCLUDE_PATTERN = r"(?:안내사항없음|자체해결|_자체해결)"
 c1, c2, c3 = st.columns(3)
 
 with c1:
     with st.container():
         card_title("🗂️", "대분류 TOP 10")
-        top10_like(fdf, "대분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
+        top10_like(fcube, "대분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
 
 with c2:
     with st.container():
         card_title("🧩", "중분류 TOP 10")
-        top10_like(fdf, "중분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
+        top10_like(fcube, "중분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
 
 with c3:
     with st.container():
         card_title("🏷️", "소분류 TOP 10")
-        top10_like(fdf, "소분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
+        top10_like(fcube, "소분류", CHART_H_BOTTOM, exclude_pattern=EXCLUDE_PATTERN)
+
+st.caption("※ Premium UI v12.4.7 + 요약 카드 문구/글자/줄간격만 가독성 개선")
 
-st.caption("※ Premium UI v12.4.7 + 요약 카드 문구/글자/줄간격만 가독성 개선")
\ No newline at end of file
+peak_mb = mem_trace_peak()
+if peak_mb is not None:
+    st.caption(f"rerun peak 메모리: {peak_mb:.1f} MB (기준 {MEM_BUDGET_MB:.0f} MB)")
+    if peak_mb > MEM_BUDGET_MB:
+        st.warning(f"이번 rerun의 peak 메모리가 기준({MEM_BUDGET_MB:.0f} MB)을 넘었어요: {peak_mb:.1f} MB")
@@ -1,5 +1,4 @@
 # pages/01_관리자.py
-import io
 import os
 import time
 from datetime import datetime
@@ -8,12 +7,16 @@ import pandas as pd
 import streamlit as st
 
 from utils import (
-    REQUIRED_COLS,
     CHANNELS,
-    normalize_master_like,
-    parse_date_series,
-    save_master_bytes,
+    ingest_status,
+    save_master_parquet,
+    staging_preview,
+    submit_ingest,
     load_master_updated_at,
+    load_master_manifest,
+    list_master_versions,
+    rollback_master,
+    master_xlsx_bytes,
 )
 
 st.set_page_config(page_title="관리자", layout="wide")
@@ -51,7 +54,8 @@ else:
     st.stop()
 
 updated_at = load_master_updated_at(st) or "없음 (처음이면 정상)"
-st.info(f"현재 master 업데이트: {updated_at}")
+cur_version = load_master_manifest().get("version")
+st.info(f"현재 master 업데이트: {updated_at}" + (f" (v{cur_version})" if cur_version else ""))
 
 st.divider()
 
@@ -67,63 +71,54 @@ with c3:
     up_board = st.file_uploader("게시판 파일 업로드", type=["csv", "xlsx", "xls"], key="up_board")
 
 
-def read_any(file):
-    """csv/xlsx 자동 읽기"""
-    if file is None:
-        return None
-    name = (file.name or "").lower()
-    if name.endswith(".csv"):
-        return pd.read_csv(file)
-    return pd.read_excel(file)
-
-
-def prep(df: pd.DataFrame, channel_name: str) -> pd.DataFrame:
+def ingest_key(file_obj, channel_name: str) -> str:
     """
-    utils.normalize_master_like로 컬럼 표준화 후,
-    REQUIRED_COLS + 채널 + 상담메모 컬럼까지 master 형태로 정리
+    업로드 파일을 백그라운드 ingest job으로 등록 (utils.submit_ingest, 파일 내용 hash로 캐시)
+    같은 업로드 파일이면 rerun 때 hash도 다시 계산하지 않도록 세션에 job key를 기억해 둔다.
     """
-    if df is None or df.empty:
-        raise ValueError(f"[{channel_name}] 파일이 비어있습니다.")
-
-    df = normalize_master_like(df)
-
-    miss = [c for c in REQUIRED_COLS if c not in df.columns]
-    if miss:
-        raise ValueError(f"[{channel_name}] 필수 컬럼 누락: {miss} / 실제: {df.columns.tolist()}")
-
-    # 상담메모 / 상담내역 둘 다 대응
-    if "상담메모" not in df.columns:
-        if "상담내역" in df.columns:
-            df["상담메모"] = df["상담내역"]
+    keys = st.session_state.setdefault("ingest_keys", {})
+    fid = (channel_name, getattr(file_obj, "file_id", None) or f"{file_obj.name}-{file_obj.size}")
+    key = keys.get(fid)
+    if key is None or ingest_status(key)["state"] == "missing":
+        key = keys[fid] = submit_ingest(file_obj, channel_name)
+    return key
+
+
+@st.fragment(run_every=1.0)
+def ingest_progress(keys: list[str]):
+    # 처리 중인 파일별 진행률 (1초마다 이 영역만 다시 그림, 모두 끝나면 페이지 전체 rerun)
+    jobs = [ingest_status(k) for k in keys]
+    for j in jobs:
+        label = f"[{j.get('channel', '')}] {j.get('name', '')}"
+        if j["state"] == "running":
+            st.progress(j.get("fraction") or 0.0, text=f"{label} 처리 중… {j.get('raw_rows', 0):,}행")
+        elif j["state"] == "done":
+            st.progress(1.0, text=f"{label} 완료 ({j.get('rows', 0):,}건)")
         else:
-            df["상담메모"] = ""
-
-    df = df[REQUIRED_COLS + ["상담메모"]].copy()
-    df["날짜"] = parse_date_series(df["날짜"])
-    df = df[df["날짜"].notna()].copy()
-
-    df["채널"] = channel_name
-    for c in ["기업명", "대분류", "중분류", "소분류", "상담메모"]:
-        df[c] = df[c].fillna("").astype(str).str.strip()
-
-    df["채널"] = df["채널"].fillna("").astype(str).str.strip()
-    return df
+            st.progress(1.0, text=f"{label} 실패")
+    if all(j["state"] != "running" for j in jobs):
+        st.rerun()
 
 
-dfs = []
-errors = []
-counts = {"유선": 0, "채팅": 0, "게시판": 0}
-
+job_keys = []
 for file_obj, ch in [(up_tel, "유선"), (up_chat, "채팅"), (up_board, "게시판")]:
     if file_obj is None:
         continue
-    try:
-        d0 = read_any(file_obj)
-        d1 = prep(d0, ch)
-        dfs.append(d1)
-        counts[ch] = int(len(d1))
-    except Exception as e:
-        errors.append(f"[{ch}] {getattr(file_obj, 'name', '파일')} 처리 실패: {e}")
+    job_keys.append(ingest_key(file_obj, ch))
+
+jobs = [ingest_status(k) for k in job_keys]
+running = any(j["state"] == "running" for j in jobs)
+if running:
+    ingest_progress(job_keys)
+
+staged = [j["path"] for j in jobs if j["state"] == "done"]
+errors = [f"[{j['channel']}] {j['name'] or '파일'} 처리 실패: {j['error']}" for j in jobs if j["state"] == "error"]
+counts = {"유선": 0, "채팅": 0, "게시판": 0}
+dropped = {"유선": 0, "채팅": 0, "게시판": 0}
+for j in jobs:
+    if j["state"] == "done":
+        counts[j["channel"]] = int(j["rows"])
+        dropped[j["channel"]] = int(j["raw_rows"]) - int(j["rows"])
 
 st.subheader("업로드 로드 결과(채널별 건수)")
 cc1, cc2, cc3 = st.columns(3)
@@ -131,46 +126,123 @@ cc1.metric("유선", f"{counts['유선']:,}건")
 cc2.metric("채팅", f"{counts['채팅']:,}건")
 cc3.metric("게시판", f"{counts['게시판']:,}건")
 
+if any(dropped.values()):
+    st.warning(
+        "날짜가 비어있거나 읽을 수 없어 제외된 행이 있습니다: "
+        + ", ".join(f"{ch} {n:,}건" for ch, n in dropped.items() if n)
+    )
+
 if errors:
     st.error("업로드/전처리 오류가 있습니다.\n\n- " + "\n- ".join(errors))
 
-can_save = (len(dfs) > 0) and (len(errors) == 0)
+can_save = (len(staged) > 0) and (len(errors) == 0) and not running
 
 st.caption("파일을 업로드하면 미리보기 및 저장 버튼이 활성화됩니다.")
 
-if dfs:
+if staged:
     st.markdown("#### 미리보기(통합 전, 상위 80행)")
-    preview = pd.concat(dfs, ignore_index=True).head(80)
+    preview = staging_preview(staged, 80)
     st.dataframe(preview, use_container_width=True)
 
 st.divider()
 
+SAVE_MODES = {
+    "추가(기존 master에 새 행만 추가)": "append",
+    "전체 교체(업로드 파일로 master 재구성)": "replace",
+}
+save_mode_label = st.radio("저장 방식", list(SAVE_MODES.keys()), index=0, horizontal=True)
+save_mode = SAVE_MODES[save_mode_label]
+if save_mode == "append":
+    st.caption("기존 master와 내용이 같은 행(날짜·채널·기업명·분류·상담메모)은 건너뛰고, 업로드하지 않은 채널/기간은 그대로 유지됩니다.")
+else:
+    st.caption("⚠️ 업로드한 파일에 없는 채널/기간은 master에서 빠집니다.")
+
 btn = st.button("💾 master 저장(통합)", disabled=not can_save, use_container_width=True)
 
 if btn:
     t0 = time.perf_counter()
     with st.spinner("통합/저장 중..."):
-        merged = pd.concat(dfs, ignore_index=True)
-
-        merged = merged[REQUIRED_COLS + ["채널", "상담메모"]].copy()
-        merged = merged.dropna(subset=["날짜"]).copy()
-
-        out = io.BytesIO()
-        with pd.ExcelWriter(out, engine="openpyxl") as w:
-            merged.to_excel(w, index=False, sheet_name="master")
-
-        b = out.getvalue()
-        elapsed = time.perf_counter() - t0
-
         meta = {
             "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "rows": int(len(merged)),
-            "save_seconds": round(float(elapsed), 3),
         }
+        meta = save_master_parquet(staged, meta, mode=save_mode)
+        st.session_state.pop("master_xlsx", None)
+        elapsed = time.perf_counter() - t0
 
-        save_master_bytes(b, meta)
-
-    st.success("저장 완료! 왼쪽 메뉴에서 app을 눌러주세요 👈")
-    st.caption(f"저장 시간: {elapsed:.2f}초 / 저장 rows: {len(merged):,}")
+    if save_mode == "append" and meta.get("added_rows", 0) == 0:
+        st.info(f"새로 추가할 행이 없습니다. (중복 {meta.get('skipped_rows', 0):,}건 건너뜀)")
+        st.stop()
+
+    st.success(
+        f"저장 완료(v{meta['version']})! 추가 {meta.get('added_rows', 0):,}건 / 중복 제외 {meta.get('skipped_rows', 0):,}건 "
+        "— 왼쪽 메뉴에서 app을 눌러주세요 👈"
+    )
+    tm = meta.get("timings", {})
+    st.caption(
+        f"저장 시간: {elapsed:.2f}초 (타입 {tm.get('typing', 0):.2f}s / arrow {tm.get('arrow', 0):.2f}s / "
+        f"parquet 기록 {tm.get('write', 0):.2f}s) / 저장 rows: {meta['rows']:,} / {meta['bytes'] / 1024 / 1024:.1f}MB"
+    )
     time.sleep(0.2)
-    st.rerun()
\ No newline at end of file
+    st.rerun()
+
+# -----------------------------
+# 버전 관리(롤백)
+# -----------------------------
+versions = list_master_versions()
+if versions:
+    st.divider()
+    st.markdown("#### master 버전(롤백)")
+    st.caption("최근 저장본을 보관합니다. 롤백은 현재 버전 표시만 바꾸므로 즉시 반영됩니다.")
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "버전": f"v{v['version']}" + (" (현재)" if v["version"] == cur_version else ""),
+                    "저장 시각": v.get("updated_at", ""),
+                    "방식": "추가" if v.get("mode") == "append" else "교체",
+                    "rows": v.get("rows", 0),
+                    "추가 rows": v.get("added_rows", v.get("rows", 0)),
+                    "저장 시간(초)": v.get("save_seconds", 0),
+                }
+                for v in versions
+            ]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    rb_opts = [v["version"] for v in versions if v["version"] != cur_version]
+    if rb_opts:
+        r1, r2 = st.columns([2, 1])
+        with r1:
+            rb_version = st.selectbox("되돌릴 버전", rb_opts, format_func=lambda v: f"v{v}")
+        with r2:
+            st.write("")
+            if st.button("↩️ 이 버전으로 롤백", use_container_width=True):
+                try:
+                    rollback_master(rb_version)
+                    st.success(f"v{rb_version} 으로 롤백했습니다.")
+                    time.sleep(0.2)
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+
+# -----------------------------
+# (선택) master xlsx 다운로드
+# -----------------------------
+st.divider()
+st.markdown("#### master xlsx 내보내기(선택)")
+st.caption("대시보드는 master.meta(manifest)가 가리키는 현재 버전의 data/master/ 월별 parquet part를 읽습니다. 엑셀 파일이 필요할 때만 생성하세요.")
+
+if st.button("📄 xlsx 생성", use_container_width=True):
+    with st.spinner("xlsx 생성 중..."):
+        st.session_state["master_xlsx"] = master_xlsx_bytes()
+
+if st.session_state.get("master_xlsx"):
+    st.download_button(
+        "⬇️ master.xlsx 다운로드",
+        data=st.session_state["master_xlsx"],
+        file_name="master.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        use_container_width=True,
+    )
\ No newline at end of file
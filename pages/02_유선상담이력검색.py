@@ -1,16 +1,20 @@
-import os
-import re
 import pandas as pd
 import streamlit as st
 
-st.set_page_config(page_title="유선 상담이력 검색", layout="wide")
+from utils import (
+    FUZZY_THRESHOLD,
+    TEXT_CANDIDATES,
+    fuzzy_search_window,
+    load_master,
+    master_date_bounds,
+    option_format,
+    search_window,
+    taxonomy_index,
+    taxonomy_options,
+)
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-MASTER_XLSX = os.path.join(DATA_DIR, "master.xlsx")
+st.set_page_config(page_title="유선 상담이력 검색", layout="wide")
 
-TEXT_CANDIDATES = ["상담메모", "상담내역", "문의내용", "상담내용", "VOC", "내용", "상세내용"]
-REQUIRED_COLS = ["날짜", "기업명", "대분류", "중분류", "소분류", "채널"]
 
 st.markdown(
     """
@@ -65,36 +69,8 @@ st.markdown(
 )
 
 
-def must_cols(df: pd.DataFrame, cols):
-    miss = [c for c in cols if c not in df.columns]
-    if miss:
-        raise ValueError(f"master.xlsx에 필수 컬럼이 없습니다: {miss}")
-
-
-@st.cache_data(show_spinner=False)
-def load_master(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        return pd.DataFrame()
-
-    df = pd.read_excel(path)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    must_cols(df, REQUIRED_COLS)
-
-    df["날짜"] = pd.to_datetime(df["날짜"], errors="coerce")
-    df = df.dropna(subset=["날짜"]).copy()
-
-    for c in REQUIRED_COLS:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
-            df.loc[df[c].isin(["nan", "None", "NaN", ""]), c] = None
-
-    for c in TEXT_CANDIDATES:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
-            df.loc[df[c].isin(["nan", "None", "NaN", ""]), c] = None
-
-    return df
+# 결과 표는 현재 페이지 행만 브라우저로 보낸다
+PAGE_SIZES = [50, 100, 200, 500]
 
 
 def detect_text_col(df_: pd.DataFrame) -> str | None:
@@ -104,48 +80,17 @@ def detect_text_col(df_: pd.DataFrame) -> str | None:
     return None
 
 
-def contains_search(series: pd.Series, keyword: str) -> pd.Series:
-    if not keyword:
-        return pd.Series([True] * len(series), index=series.index)
-
-    kw = str(keyword).strip()
-    if not kw:
-        return pd.Series([True] * len(series), index=series.index)
-
-    return series.fillna("").astype(str).str.contains(re.escape(kw), case=False, na=False)
-
-
 # -----------------------------
 # load
 # -----------------------------
-df = load_master(MASTER_XLSX)
+bound_lo, bound_hi = master_date_bounds()
 
-if df.empty:
-    st.error("data/master.xlsx 를 찾을 수 없거나 데이터가 비어있어요.")
-    st.stop()
-
-text_col = detect_text_col(df)
-if not text_col:
-    st.error("master.xlsx 에 상담메모/상담내역 컬럼이 없어요.")
+if bound_lo is None or bound_hi is None:
+    st.error("data/master 를 찾을 수 없거나 데이터가 비어있어요.")
     st.stop()
 
-df = df[df["채널"] == "유선"].copy()
-
-if df.empty:
-    st.warning("유선 데이터가 없어요.")
-    st.stop()
-
-# 검색 대상: 상담메모 + 분류 컬럼 모두 포함
-df["_검색대상"] = (
-    df[text_col].fillna("").astype(str) + " " +
-    df["대분류"].fillna("").astype(str) + " " +
-    df["중분류"].fillna("").astype(str) + " " +
-    df["소분류"].fillna("").astype(str) + " " +
-    df["기업명"].fillna("").astype(str)
-)
-
-min_d = pd.to_datetime(df["날짜"]).min().date()
-max_d = pd.to_datetime(df["날짜"]).max().date()
+min_d = bound_lo.date()
+max_d = bound_hi.date()
 
 st.markdown('<div class="page-title">유선 상담이력 검색</div>', unsafe_allow_html=True)
 st.markdown(
@@ -161,7 +106,12 @@ st.markdown('<div class="filter-box">', unsafe_allow_html=True)
 c1, c2, c3 = st.columns([1.8, 1.2, 1.0])
 
 with c1:
-    keyword = st.text_input("검색어", placeholder="예: 수료관련 문의, 로그인, 환불, 자동결제")
+    keyword = st.text_input(
+        "검색어",
+        placeholder="예: 수료관련 문의, 로그인, 환불, 자동결제",
+        help='공백 = 모두 포함(AND), 쉼표 = 하나라도 포함(OR), "따옴표" = 문구 그대로, -단어 = 제외, '
+             "기업:/대:/중:/소:/메모: = 해당 항목에서만 검색",
+    )
 
 with c2:
     date_range = st.date_input("기간", value=(min_d, max_d), min_value=min_d, max_value=max_d)
@@ -170,67 +120,91 @@ with c2:
     else:
         start_d, end_d = min_d, max_d
 
+start_dt = pd.to_datetime(start_d)
+end_dt = pd.to_datetime(end_d) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+
+# -----------------------------
+# load (프로세스 공용 master에서 선택 기간 구간만)
+# -----------------------------
+df = load_master(start_dt, end_dt)
+
+if not len(df.columns):
+    st.error("data/master 를 찾을 수 없거나 데이터가 비어있어요.")
+    st.stop()
+
+text_col = detect_text_col(df)
+if not text_col:
+    st.error("master 에 상담메모/상담내역 컬럼이 없어요.")
+    st.stop()
+
 with c3:
-    companies = ["전체"] + sorted(df["기업명"].dropna().unique().tolist())
+    companies = ["전체"] + sorted(df["기업명"][df["채널"] == "유선"].dropna().unique().tolist())
     company = st.selectbox("기업명", companies, index=0)
 
 c4, c5, c6 = st.columns(3)
 
-with c4:
-    big_opts = ["전체"] + sorted(df["대분류"].dropna().unique().tolist())
-    big = st.selectbox("대분류", big_opts, index=0)
+# 분류 옵션/건수: 유선 기준 분류 tree에서 바로 읽는다
+tree = taxonomy_index(start_dt, end_dt, channel="유선")
 
-tmp_mid = df.copy()
-if big != "전체":
-    tmp_mid = tmp_mid[tmp_mid["대분류"] == big]
+with c4:
+    big_counts = taxonomy_options(tree)
+    big = st.selectbox("대분류", ["전체"] + list(big_counts), index=0, format_func=option_format(big_counts))
 
 with c5:
-    mid_opts = ["전체"] + sorted(tmp_mid["중분류"].dropna().unique().tolist())
-    mid = st.selectbox("중분류", mid_opts, index=0)
-
-tmp_small = tmp_mid.copy()
-if mid != "전체":
-    tmp_small = tmp_small[tmp_small["중분류"] == mid]
+    mid_counts = taxonomy_options(tree, big)
+    mid = st.selectbox("중분류", ["전체"] + list(mid_counts), index=0, format_func=option_format(mid_counts))
 
 with c6:
-    small_opts = ["전체"] + sorted(tmp_small["소분류"].dropna().unique().tolist())
-    small = st.selectbox("소분류", small_opts, index=0)
+    small_counts = taxonomy_options(tree, big, mid)
+    small = st.selectbox("소분류", ["전체"] + list(small_counts), index=0, format_func=option_format(small_counts))
+
+c7, c8 = st.columns([1.0, 2.0])
+
+with c7:
+    fuzzy = st.toggle("유사 검색 (오타·띄어쓰기 허용)", value=False)
+
+with c8:
+    threshold = st.slider("유사도 기준", 50, 100, FUZZY_THRESHOLD, step=5, disabled=not fuzzy)
 
 st.markdown('</div>', unsafe_allow_html=True)
 
 # -----------------------------
 # apply filters
 # -----------------------------
-fdf = df.copy()
-
-start_dt = pd.to_datetime(start_d)
-end_dt = pd.to_datetime(end_d) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+selected = {"채널": "유선", "기업명": company, "대분류": big, "중분류": mid, "소분류": small}
 
-fdf = fdf[
-    (pd.to_datetime(fdf["날짜"]) >= start_dt) &
-    (pd.to_datetime(fdf["날짜"]) <= end_dt)
-].copy()
+if fuzzy and keyword and str(keyword).strip():
+    # 유사 검색: 검색어 전체를 한 문구로 채점 → 유사도순
+    frame, order, scores = fuzzy_search_window(keyword, start_dt, end_dt, threshold=threshold, **selected)
+else:
+    # 검색 대상: 상담메모 + 분류 컬럼 + 기업명 (단어별로 검색 index 후보만 원문 확인 후 AND/OR/제외 집합 연산)
+    frame, idx = search_window(keyword, start_dt, end_dt, **selected)
+    # 공용 master는 날짜순 정렬이라 행 위치를 뒤집으면 최신순 (전체 정렬 없음)
+    order, scores = idx[::-1], None
 
-if company != "전체":
-    fdf = fdf[fdf["기업명"] == company]
+# -----------------------------
+# result (현재 페이지 행만 꺼내서 표시용으로 변환)
+# -----------------------------
+total = len(order)
 
-if big != "전체":
-    fdf = fdf[fdf["대분류"] == big]
+p1, p2, p3 = st.columns([1.0, 1.0, 4.0])
 
-if mid != "전체":
-    fdf = fdf[fdf["중분류"] == mid]
+with p1:
+    page_size = st.selectbox("페이지당 건수", PAGE_SIZES, index=1)
 
-if small != "전체":
-    fdf = fdf[fdf["소분류"] == small]
+n_pages = max(1, -(-total // page_size))
 
-if keyword and str(keyword).strip():
-    fdf = fdf[contains_search(fdf["_검색대상"], keyword)].copy()
+# 검색 조건이 바뀌면 1페이지로
+query_sig = (keyword, fuzzy, threshold, company, big, mid, small, start_d, end_d, page_size)
+if st.session_state.get("search_sig") != query_sig or st.session_state.get("search_page", 1) > n_pages:
+    st.session_state["search_sig"] = query_sig
+    st.session_state["search_page"] = 1
 
-fdf = fdf.sort_values("날짜", ascending=False).reset_index(drop=True)
+with p2:
+    page = st.number_input(f"페이지 (총 {n_pages:,})", min_value=1, max_value=n_pages, step=1, key="search_page")
 
-# 표시용 컬럼 정리
-show_df = fdf.copy()
-show_df["날짜"] = pd.to_datetime(show_df["날짜"], errors="coerce").dt.strftime("%Y-%m-%d")
+lo = (int(page) - 1) * page_size
+rows = order[lo:lo + page_size]
 
 display_cols = ["날짜", "기업명", "대분류", "중분류", "소분류", text_col]
 display_names = {
@@ -242,14 +216,24 @@ display_names = {
     text_col: "상담메모",
 }
 
-show_df = show_df[display_cols].rename(columns=display_names)
+show_df = frame.iloc[rows, [frame.columns.get_loc(c) for c in display_cols]].reset_index(drop=True)
+show_df["날짜"] = show_df["날짜"].dt.strftime("%Y-%m-%d")
+show_df = show_df.rename(columns=display_names)
+if scores is not None:
+    show_df["유사도"] = scores[lo:lo + page_size].round().astype(int)
 
 st.markdown('<div class="result-box">', unsafe_allow_html=True)
-st.markdown(f'<div class="result-count">검색 결과 {len(show_df):,}건</div>', unsafe_allow_html=True)
+if total:
+    st.markdown(
+        f'<div class="result-count">검색 결과 {total:,}건 · {lo + 1:,}~{lo + len(rows):,}번째</div>',
+        unsafe_allow_html=True,
+    )
+else:
+    st.markdown('<div class="result-count">검색 결과 0건</div>', unsafe_allow_html=True)
 
 if show_df.empty:
     st.info("검색 결과가 없어요.")
 else:
     st.dataframe(show_df, use_container_width=True, height=700)
 
-st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+st.markdown('</div>', unsafe_allow_html=True)
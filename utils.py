@@ -1,8 +1,27 @@
 import os
 import io
+import re
 import json
 import time
+import hashlib
+import itertools
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+import multiprocessing as mp
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.tseries.api import guess_datetime_format
+from rapidfuzz import fuzz, process
 from datetime import datetime
 
 # -----------------------------
@@ -13,7 +32,25 @@ CHANNELS = ["유선", "채팅", "게시판"]
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 MASTER_XLSX = os.path.join(DATA_DIR, "master.xlsx")
+MASTER_PARQUET = os.path.join(DATA_DIR, "master.parquet")
 MASTER_META = os.path.join(DATA_DIR, "master.meta")
+# 버전별 master 스냅샷 저장소 (master.meta = 현재 버전을 가리키는 manifest)
+MASTER_STORE_DIR = os.path.join(DATA_DIR, "master")
+MASTER_KEEP_VERSIONS = 5
+# 한 달 partition에 쌓인 part가 이 개수에 이르면 추가 저장 시 그 달을 part 하나로 합쳐 다시 쓴다
+MONTH_PARTS_MAX = 8
+
+# parquet 저장 시 category(dictionary)로 인코딩할 차원 컬럼 / 문자열 메모 컬럼
+DIM_COLS = ["기업명", "대분류", "중분류", "소분류", "채널"]
+MEMO_COL = "상담메모"
+# 상담 텍스트 후보 컬럼 (상담메모 우선)
+TEXT_CANDIDATES = ["상담메모", "상담내역", "문의내용", "상담내용", "VOC", "내용", "상세내용"]
+# 차원 값 중 결측으로 취급할 문자열 (category에 넣지 않음 → 로드 시 NaN)
+NULL_TOKENS = ["", "nan", "None", "NaN"]
+
+# parquet writer 설정 (row group 단위로 기록 → 행 수에 선형)
+PARQUET_ROW_GROUP = 128_000
+PARQUET_COMPRESSION = "snappy"
 
 COL_ALIAS = {
     # 날짜
@@ -38,29 +75,207 @@ COL_ALIAS = {
 def ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
+# 저장 시 정리(clean_text)를 마친 part라는 표시 (parquet schema metadata)
+CLEAN_META_KEY = b"voc.clean"
+
+def clean_text(s: pd.Series) -> pd.Series:
+    """
+    문자열 컬럼 정리 (컬럼당 1회): 앞뒤 공백 제거, 결측/결측 표기(NULL_TOKENS) → NA
+    pyarrow compute로 처리하며 NaN을 "nan" 문자열로 만들지 않는다. 반환 dtype: string
+    """
+    arr = pa.array(s.astype("string"), type=pa.string(), from_pandas=True)
+    out = _clean_text_array(arr).to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+    out.index = s.index
+    return out
+
+def _clean_text_array(arr):
+    arr = pc.utf8_trim_whitespace(arr)
+    return pc.if_else(pc.is_in(arr, value_set=pa.array(NULL_TOKENS)), pa.scalar(None, arr.type), arr)
+
 def normalize_master_like(df: pd.DataFrame) -> pd.DataFrame:
-    # 컬럼명 정리
-    df = df.copy()
-    df.columns = [str(c).strip() for c in df.columns]
+    """
+    업로드/예전 master 컬럼 표준화 (ingest 시 한 번만 하는 정리 단계)
+    - 컬럼명 trim + alias 매핑
+    - 차원/텍스트 컬럼: clean_text (공백 제거, 결측은 NA)
+    """
+    df = df.set_axis([COL_ALIAS.get(str(c).strip(), str(c).strip()) for c in df.columns], axis=1)
+    cols = {c: clean_text(df[c]) for c in DIM_COLS + TEXT_CANDIDATES if c in df.columns}
+    return df.assign(**cols) if cols else df
 
-    # alias 매핑
-    rename = {}
-    for c in df.columns:
-        if c in COL_ALIAS:
-            rename[c] = COL_ALIAS[c]
-    if rename:
-        df = df.rename(columns=rename)
+# -----------------------------
+# 날짜 파싱 (형식 감지 → 고정 format으로 일괄 변환)
+# -----------------------------
+# 상담 export에서 보이는 날짜 형식 (앞쪽일수록 우선). "excel" = 엑셀 일련번호(1899-12-30 기준 일수)
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    # 시간대 offset 포함 (+09:00 등) → LOCAL_TZ(한국 시간) 기준 naive로 변환
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%d %H:%M:%S%z",
+    "%Y.%m.%d %H:%M:%S",
+    "%Y.%m.%d %H:%M",
+    "%Y.%m.%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y/%m/%d",
+    "%Y%m%d%H%M%S",
+    "%Y%m%d",
+    "excel",
+]
+DATE_SAMPLE = 500
+# 표본에서 이 비율 이상 변환되면 그 형식으로 확정
+DATE_MIN_HIT = 0.9
+# 엑셀 일련번호로 볼 범위 (1954 ~ 2118년)
+EXCEL_SERIAL_RANGE = (20000, 80000)
+DATE_FORMAT_CACHE = os.path.join(DATA_DIR, "date_formats.json")
+# 시간대가 붙은 날짜는 이 시간대의 시각(wall time)으로 맞춰 naive로 저장
+LOCAL_TZ = "Asia/Seoul"
+# 끝에 시간대 offset이 붙은 값 (Z, +09:00, +0900)
+_TZ_SUFFIX = r"(?:Z|[+-]\d{2}:?\d{2})$"
 
-    # 문자열 trim
-    for c in ["기업명", "대분류", "중분류", "소분류", "채널"]:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
+_DATE_FORMATS = {"sig": None, "by_source": {}}
+_DATE_FORMAT_LOCK = threading.Lock()
 
-    return df
+def _excel_serial(s: pd.Series) -> pd.Series:
+    nums = pd.to_numeric(s, errors="coerce")
+    nums = nums.where((nums >= EXCEL_SERIAL_RANGE[0]) & (nums < EXCEL_SERIAL_RANGE[1]))
+    return pd.to_datetime(nums, unit="D", origin="1899-12-30").dt.round("s")
+
+def _to_naive(out: pd.Series) -> pd.Series:
+    # 시간대가 있는 값 → LOCAL_TZ 시각 그대로 naive datetime64[ns] (KST export는 적힌 시각 그대로)
+    return out.dt.tz_convert(LOCAL_TZ).dt.tz_localize(None).astype("datetime64[ns]")
+
+def _parse_iso(s: pd.Series) -> pd.Series:
+    # ISO8601 (offset 있는 값만 utc로 읽어 LOCAL_TZ로 맞추고, 없는 값은 적힌 시각 그대로)
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    tz = s.str.contains(_TZ_SUFFIX, regex=True, na=False).to_numpy()
+    if tz.any():
+        out[tz] = _to_naive(pd.to_datetime(s[tz], errors="coerce", format="ISO8601", utc=True))
+    if (~tz).any():
+        out[~tz] = pd.to_datetime(s[~tz], errors="coerce", format="ISO8601").astype("datetime64[ns]")
+    return out
+
+def _parse_with(s: pd.Series, fmt: str) -> pd.Series:
+    if fmt == "excel":
+        return _excel_serial(s)
+    if "%z" in fmt:
+        return _to_naive(pd.to_datetime(s, format=fmt, errors="coerce", utc=True))
+    return pd.to_datetime(s, format=fmt, errors="coerce")
+
+def _date_hit_rate(sample: pd.Series, fmt: str) -> float:
+    if not len(sample):
+        return 0.0
+    return float(_parse_with(sample.astype("string").str.strip(), fmt).notna().mean())
+
+def detect_date_format(s: pd.Series) -> str | None:
+    # 값 표본으로 DATE_FORMATS 중 가장 많이 맞는 형식 (DATE_MIN_HIT 미만이면 None)
+    vals = s.dropna()
+    sample = vals.sample(DATE_SAMPLE, random_state=0) if len(vals) > DATE_SAMPLE else vals
+    best, best_rate = None, 0.0
+    for fmt in DATE_FORMATS:
+        rate = _date_hit_rate(sample, fmt)
+        if rate > best_rate:
+            best, best_rate = fmt, rate
+        if rate >= 1.0:
+            break
+    return best if best_rate >= DATE_MIN_HIT else None
 
-def parse_date_series(s: pd.Series) -> pd.Series:
-    # robust datetime parse
-    return pd.to_datetime(s, errors="coerce")
+def _read_date_formats() -> dict:
+    # data/date_formats.json (파일이 바뀌었을 때만 다시 읽는다 — 다른 worker가 기록한 채널도 보이게)
+    try:
+        st_ = os.stat(DATE_FORMAT_CACHE)
+        sig = (st_.st_ino, st_.st_mtime_ns, st_.st_size)
+    except OSError:
+        return _DATE_FORMATS["by_source"]
+    if sig != _DATE_FORMATS["sig"]:
+        try:
+            with open(DATE_FORMAT_CACHE, "r", encoding="utf-8") as f:
+                _DATE_FORMATS["by_source"] = json.load(f)
+        except:
+            pass
+        _DATE_FORMATS["sig"] = sig
+    return _DATE_FORMATS["by_source"]
+
+@contextmanager
+def _file_lock(path: str):
+    # 프로세스 간 배타 잠금 (ingest worker들이 같은 파일을 고칠 때). fcntl이 없는 환경은 thread 잠금만
+    with _DATE_FORMAT_LOCK, open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _cached_date_format(source: str) -> str | None:
+    return _read_date_formats().get(source)
+
+def _remember_date_format(source: str, fmt: str):
+    if _read_date_formats().get(source) == fmt:
+        return
+    try:
+        ensure_data_dir()
+        # 잠근 상태에서 파일을 다시 읽어 이 채널 값만 바꿔 기록 (다른 worker가 쓴 채널을 덮어쓰지 않음)
+        with _file_lock(DATE_FORMAT_CACHE + ".lock"):
+            _DATE_FORMATS["sig"] = None
+            merged = dict(_read_date_formats())
+            merged[source] = fmt
+            atomic_write_json(DATE_FORMAT_CACHE, merged)
+            _DATE_FORMATS.update(sig=None, by_source=merged)
+    except OSError:
+        _DATE_FORMATS["by_source"] = {**_DATE_FORMATS["by_source"], source: fmt}
+
+def parse_date_series(s: pd.Series, source: str | None = None) -> pd.Series:
+    """
+    날짜 컬럼 → datetime64[ns] (변환 못 한 값은 NaT)
+    1) 이미 datetime이면 그대로 (시간대가 있으면 LOCAL_TZ 시각으로 맞춘 naive)
+    2) 표본으로 형식을 정하고(source별로 data/date_formats.json에 기억) 그 format으로 한 번에 변환
+    3) 그 형식에 안 맞는 나머지 값만 ISO8601로 다시 시도하고, 그래도 남으면 첫 값에서 추정한
+       형식 하나로만 변환 (값마다 해석하지 않으므로 일/월 순서가 행마다 달라지지 않음)
+    끝까지 변환 못 한 값은 NaT → 업로드 시 해당 행은 제외된다.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if getattr(s.dt, "tz", None) is not None:
+            # 문자열 offset 경로와 같은 기준 (같은 시각이면 같은 날짜 값 → 같은 content key)
+            return _to_naive(s)
+        return s.astype("datetime64[ns]") if s.dtype != "datetime64[ns]" else s
+    if pd.api.types.is_numeric_dtype(s):
+        # 숫자 컬럼: 엑셀 일련번호, 아니면 20250101 같은 숫자 날짜 → 문자열로 보고 감지
+        if _date_hit_rate(s.dropna().head(DATE_SAMPLE), "excel") >= DATE_MIN_HIT:
+            return _excel_serial(s).astype("datetime64[ns]")
+        # 빈 칸이 있으면 csv의 정수 날짜가 float(20250101.0)로 읽히므로 정수값이면 Int64를 거친다
+        whole = pd.api.types.is_integer_dtype(s) or bool((s.dropna() % 1 == 0).all())
+        s = s.astype("Int64").astype("string") if whole else s.astype("string")
+
+    fmt = _cached_date_format(source) if source else None
+    if fmt is not None and _date_hit_rate(s.dropna().head(DATE_SAMPLE), fmt) < DATE_MIN_HIT:
+        fmt = None
+    if fmt is None:
+        fmt = detect_date_format(s)
+        if fmt is not None and source:
+            _remember_date_format(source, fmt)
+
+    out = _parse_with(s, fmt).astype("datetime64[ns]") if fmt else pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    left = (out.isna() & s.notna()).to_numpy()
+    if left.any():
+        # 앞뒤 공백/datetime 객체가 섞인 값은 문자열로 맞춰서 ISO8601로 다시 시도
+        rest = s[left].astype("string").str.strip()
+        rest = rest.where(rest != "")
+        out[left] = _parse_iso(rest)
+        # 그래도 남은 값: 첫 값에서 형식 하나를 추정해 같은 형식으로만 변환 (안 맞으면 NaT)
+        left = (out.isna() & s.notna()).to_numpy()
+        rest = s[left].astype("string").str.strip()
+        rest = rest.where(rest != "")
+        first = rest.dropna()
+        guess = guess_datetime_format(first.iloc[0]) if len(first) else None
+        if guess is not None:
+            out[left] = _parse_with(rest, guess).astype("datetime64[ns]")
+    return out
 
 def add_time_grain(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -129,29 +344,1713 @@ def ensure_top_table(df: pd.DataFrame, col: str, n=10):
 
 def load_master_updated_at(st=None):
     ensure_data_dir()
-    if not os.path.exists(MASTER_META):
+    return load_master_manifest().get("updated_at")
+
+# -----------------------------
+# Master store (Parquet)
+# -----------------------------
+def to_master_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    master 저장용 타입 정리
+    - 날짜: datetime64
+    - 기업명/대분류/중분류/소분류/채널: category (parquet dictionary 인코딩)
+    - 상담메모 등 나머지 텍스트: string
+    """
+    cols = {}
+    for c in df.columns:
+        s = df[c]
+        if c == "날짜":
+            cols[c] = parse_date_series(s)
+        elif c in DIM_COLS:
+            cols[c] = s.astype("category")
+        elif c == MEMO_COL or s.dtype == object:
+            cols[c] = s.astype("string")
+        else:
+            cols[c] = s
+    return pd.DataFrame(cols, index=df.index).reset_index(drop=True)
+
+def write_master_table(df: pd.DataFrame, path: str) -> dict:
+    """
+    DataFrame → Arrow Table → parquet 파일로 바로 기록 (xlsx/bytes 중간 단계 없음)
+    단계별 소요 시간(초)을 dict로 돌려준다.
+    """
+    t0 = time.perf_counter()
+    frame = to_master_frame(df)
+    t1 = time.perf_counter()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), CLEAN_META_KEY: b"1"})
+    del frame
+    t2 = time.perf_counter()
+    pq.write_table(
+        table,
+        path,
+        row_group_size=PARQUET_ROW_GROUP,
+        compression=PARQUET_COMPRESSION,
+    )
+    t3 = time.perf_counter()
+    return {
+        "typing": round(t1 - t0, 3),
+        "arrow": round(t2 - t1, 3),
+        "write": round(t3 - t2, 3),
+    }
+
+# -----------------------------
+# Snapshot store (atomic write + manifest)
+# -----------------------------
+_SAVE_LOCK = threading.Lock()
+
+def _fsync_dir(path: str):
+    # 디렉터리 fsync (rename 결과까지 디스크에 반영). Windows 등 미지원 환경은 무시
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _fsync_file(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+def atomic_write_json(path: str, obj: dict):
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+_MANIFEST_CACHE = {"sig": None, "manifest": {}}
+
+def _meta_signature():
+    # master.meta는 항상 rename으로 교체되므로 inode/mtime/size가 바뀌면 새 버전
+    try:
+        st_ = os.stat(MASTER_META)
+    except OSError:
         return None
+    return (st_.st_ino, st_.st_mtime_ns, st_.st_size)
+
+def load_master_manifest() -> dict:
+    """
+    master.meta(manifest) 읽기
+    - 현재 버전 정보가 최상위에, 보관 중인 버전 목록이 history(최신순)에 들어있다.
+    - 예전 형식(updated_at/rows만 있는 meta)도 그대로 dict로 돌려준다.
+    - rerun마다 stat 한 번으로 변경 여부만 확인하고, 바뀌었을 때만 다시 파싱한다.
+      (돌려받은 dict는 공유 객체이므로 수정하지 말 것)
+    """
+    sig = _meta_signature()
+    if sig is None:
+        return {}
+    if sig == _MANIFEST_CACHE["sig"]:
+        return _MANIFEST_CACHE["manifest"]
     try:
         with open(MASTER_META, "r", encoding="utf-8") as f:
-            meta = json.load(f)
-        return meta.get("updated_at")
+            manifest = json.load(f)
     except:
-        return None
+        return {}
+    _MANIFEST_CACHE.update(sig=sig, manifest=manifest)
+    return manifest
 
-def load_master_bytes(st=None):
-    ensure_data_dir()
-    if not os.path.exists(MASTER_XLSX):
-        return None, "없음"
+def list_master_versions() -> list[dict]:
+    return load_master_manifest().get("history", [])
+
+def _store_path(rel: str) -> str:
+    return os.path.join(DATA_DIR, rel)
+
+def entry_parts(entry: dict) -> list[str]:
+    # 버전이 가리키는 part 파일 목록 (v3 이전 단일 스냅샷은 file 하나)
+    if entry.get("parts"):
+        return list(entry["parts"])
+    if entry.get("file"):
+        return [entry["file"]]
+    return []
+
+def part_month(rel: str) -> str | None:
+    # "master/월=2026-03/p000012.parquet" -> "2026-03" (월 partition이 아닌 예전 part는 None)
+    d = os.path.basename(os.path.dirname(rel))
+    return d[len("월="):] if d.startswith("월=") else None
+
+def _prune_snapshots(history: list[dict]):
+    keep = {os.path.normpath(_store_path(p)) for h in history for p in entry_parts(h)}
+    keep |= {os.path.normpath(_store_path(part_cube_path(p))) for h in history for p in entry_parts(h)}
+    keep |= {os.path.normpath(_store_path(part_grams_path(p))) for h in history for p in entry_parts(h)}
+    keep |= {os.path.normpath(_store_path(h["categories"])) for h in history if h.get("categories")}
+    for root, dirs, files in os.walk(MASTER_STORE_DIR, topdown=False):
+        for name in files:
+            path = os.path.normpath(os.path.join(root, name))
+            if name.endswith((".parquet", ".json", ".npz")) and path not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        if root != MASTER_STORE_DIR and not os.listdir(root):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+def _publish(entry: dict, history: list[dict]) -> dict:
+    manifest = {**entry, "history": history[:MASTER_KEEP_VERSIONS]}
+    atomic_write_json(MASTER_META, manifest)
+    return manifest
+
+def _write_part(df: pd.DataFrame, rel: str) -> dict:
+    # 임시 파일에 기록 → fsync → atomic rename (완성된 파일만 보이게)
+    path = _store_path(rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _tmp_path(path)
     try:
-        with open(MASTER_XLSX, "rb") as f:
-            b = f.read()
-        return b, f"local:{MASTER_XLSX}"
-    except:
-        return None, "읽기 실패"
+        timings = write_master_table(df, tmp)
+        _fsync_file(tmp)
+        os.replace(tmp, path)
+        _fsync_dir(os.path.dirname(path))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return timings
+
+# -----------------------------
+# Content key (중복 판정)
+# -----------------------------
+KEY_COLS = ["날짜", "채널", "기업명", "대분류", "중분류", "소분류", MEMO_COL]
+
+def content_key(df: pd.DataFrame) -> np.ndarray:
+    # 행 내용 해시(uint64). dtype(category/string/object)과 무관하게 같은 값이면 같은 key
+    cols = {}
+    for c in KEY_COLS:
+        if c not in df.columns:
+            cols[c] = pd.Series("", index=df.index, dtype=object)
+        elif c == "날짜":
+            cols[c] = parse_date_series(df[c]).astype("datetime64[ns]").astype("int64")
+        else:
+            s = df[c].astype(object)
+            cols[c] = s.where(s.notna(), "")
+    return pd.util.hash_pandas_object(pd.DataFrame(cols), index=False).to_numpy()
+
+def _part_date_range(path: str):
+    # parquet row group 통계로 날짜 min/max (데이터는 읽지 않음)
+    md = pq.ParquetFile(path).metadata
+    names = md.schema.to_arrow_schema().names
+    if "날짜" not in names:
+        return None, None
+    ci = names.index("날짜")
+    lo, hi = None, None
+    for i in range(md.num_row_groups):
+        st_ = md.row_group(i).column(ci).statistics
+        if st_ is None or not st_.has_min_max:
+            continue
+        lo = st_.min if lo is None else min(lo, st_.min)
+        hi = st_.max if hi is None else max(hi, st_.max)
+    return (pd.Timestamp(lo) if lo is not None else None), (pd.Timestamp(hi) if hi is not None else None)
+
+def month_label(m: int) -> str:
+    # 월 번호(연*12+월-1) → "YYYY-MM"
+    return f"{int(m) // 12:04d}-{int(m) % 12 + 1:02d}"
+
+def _month_bounds(m: int):
+    lo = pd.Timestamp(year=int(m) // 12, month=int(m) % 12 + 1, day=1)
+    return lo, lo + pd.DateOffset(months=1)
+
+def _part_keys(rel: str, months=None) -> np.ndarray:
+    """
+    part의 content key
+    months(월 번호 목록)를 주면 월 partition이 아닌 예전 part는 그 달 행만 읽는다 (날짜 필터)
+    """
+    path = _store_path(rel)
+    names = pq.read_schema(path).names
+    filters = None
+    if months is not None and part_month(rel) is None and "날짜" in names:
+        filters = [[("날짜", ">=", lo), ("날짜", "<", hi)] for lo, hi in map(_month_bounds, months)]
+    cols = ["_key"] if "_key" in names else [c for c in KEY_COLS if c in names]
+    try:
+        t = pq.read_table(path, columns=cols, filters=filters)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, TypeError):
+        # 날짜가 timestamp가 아닌 예전 파일 → 전체를 읽는다
+        t = pq.read_table(path, columns=cols)
+    if "_key" in names:
+        return t.column("_key").to_numpy()
+    # _key 없는 예전 스냅샷은 내용으로 계산
+    return content_key(t.to_pandas())
 
-def save_master_bytes(master_bytes: bytes, meta: dict):
+def _read_full_part(rel: str) -> pd.DataFrame:
+    # 같은 달 part 합치기용: _key/_kw 포함 전체 행 (예전 part는 저장 시와 같은 정리를 거친다)
+    df = normalize_master_like(pq.read_table(_store_path(rel)).to_pandas())
+    if "_key" not in df.columns:
+        df["_key"] = content_key(df)
+    if KEYWORD_COL not in df.columns:
+        df[KEYWORD_COL] = keyword_bits(df[MEMO_COL]) if MEMO_COL in df.columns else np.uint16(0)
+    return df
+
+def new_rows_mask(keys: np.ndarray, existing: np.ndarray) -> np.ndarray:
+    """
+    기존 master와 겹치지 않는 행만 True
+    같은 key가 기존에 n건 있으면 이번 업로드의 앞쪽 n건은 중복으로 본다.
+    (같은 날 같은 내용의 서로 다른 상담이 여러 건인 경우를 지우지 않기 위해 건수 기준)
+    """
+    if len(keys) == 0:
+        return np.zeros(0, dtype=bool)
+    rank = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    if len(existing) == 0:
+        return np.ones(len(keys), dtype=bool)
+    uniq, cnt = np.unique(existing, return_counts=True)
+    pos = np.searchsorted(uniq, keys)
+    pos_c = np.minimum(pos, len(uniq) - 1)
+    seen = np.where(uniq[pos_c] == keys, cnt[pos_c], 0)
+    return rank >= seen
+
+# -----------------------------
+# Aggregate cube (일 × 시간 × 채널 × 기업명 × 대/중/소 건수)
+# -----------------------------
+CUBE_DIMS = ["채널", "기업명", "대분류", "중분류", "소분류"]
+
+def part_cube_path(rel: str) -> str:
+    # part 옆에 같이 저장되는 집계 파일: pNNNNNN.parquet -> pNNNNNN.cube.parquet
+    base, ext = os.path.splitext(rel)
+    return f"{base}.cube{ext}"
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    원본 행 → 일/시간/채널/기업명/대·중·소분류 조합별 건수
+    대시보드 차트(월/요일/시간대/기업/분류 TOP, KPI)는 모두 이 cube를 필터/합산해서 그린다.
+    """
+    dims = [c for c in CUBE_DIMS if c in df.columns]
+    if df.empty:
+        return pd.DataFrame({"일": pd.Series(dtype="datetime64[ns]"), "시간": pd.Series(dtype="int8"),
+                             **{c: df[c] for c in dims}, "건수": pd.Series(dtype="int32")})
+    dates = parse_date_series(df["날짜"])
+    keys = [dates.dt.floor("D").rename("일"), dates.dt.hour.rename("시간")] + [df[c] for c in dims]
+    cube = df.groupby(keys, observed=True, dropna=False, sort=True).size().rename("건수").reset_index()
+    cube["시간"] = cube["시간"].astype("int8")
+    cube["건수"] = cube["건수"].astype("int32")
+    return cube
+
+# -----------------------------
+# 검색 index (문자 bigram postings, part별로 저장 시 함께 기록)
+# -----------------------------
+SEARCH_FIELDS = ["대분류", "중분류", "소분류", "기업명"]
+
+def part_grams_path(rel: str) -> str:
+    # pNNNNNN.parquet -> pNNNNNN.grams.npz
+    base, _ = os.path.splitext(rel)
+    return f"{base}.grams.npz"
+
+def search_text(df: pd.DataFrame) -> pd.Series:
+    # 검색 대상 문자열: 상담메모 + 대/중/소분류 + 기업명 (결측은 빈 문자열)
+    def _txt(c):
+        return df[c].astype("string").fillna("") if c in df.columns else pd.Series("", index=df.index, dtype="string")
+    text_col = next((c for c in TEXT_CANDIDATES if c in df.columns), None)
+    out = _txt(text_col) if text_col else pd.Series("", index=df.index, dtype="string")
+    for c in SEARCH_FIELDS:
+        out = out + " " + _txt(c)
+    return out
+
+def _norm_search(text: str) -> str:
+    # index/질의 공통 정규화: 소문자 + 공백 제거 (원문에 질의가 들어 있으면 bigram도 반드시 들어 있음)
+    return re.sub(r"\s+", "", str(text).lower())
+
+def _bigrams(codes: np.ndarray) -> np.ndarray:
+    # 코드포인트 배열 → 인접 두 글자 key (21bit씩)
+    return (codes[:-1].astype(np.int64) << 21) | codes[1:].astype(np.int64)
+
+def query_grams(query: str) -> np.ndarray:
+    q = _norm_search(query)
+    if len(q) < 2:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(_bigrams(np.frombuffer(q.encode("utf-32-le"), dtype=np.uint32)))
+
+def build_gram_index(texts: pd.Series) -> dict[str, np.ndarray]:
+    """
+    행별 문자열 → bigram postings (CSR)
+    keys: 정렬된 bigram key / offsets: keys별 rows 구간 / rows: 행 번호 (keys 안에서 오름차순)
+    """
+    if len(texts) == 0:
+        return {"keys": np.zeros(0, np.int64), "offsets": np.zeros(1, np.int64), "rows": np.zeros(0, np.int32)}
+    # 행 사이를 \x00 로 이어 한 번에 코드포인트 배열로 바꾼다 (행 단위 Python loop 없음)
+    joined = _norm_search("\x00".join(texts.astype("string").fillna("").tolist()))
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+    sep = codes == 0
+    row = np.cumsum(sep)[:-1].astype(np.int32)
+    ok = ~sep[:-1] & ~sep[1:]
+    keys, rows = _bigrams(codes)[ok], row[ok]
+
+    order = np.lexsort((rows, keys))
+    keys, rows = keys[order], rows[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+    keys, rows = keys[first], rows[first]
+
+    uniq, start = np.unique(keys, return_index=True)
+    offsets = np.append(start, len(keys)).astype(np.int64)
+    return {"keys": uniq, "offsets": offsets, "rows": rows}
+
+def _write_grams(df: pd.DataFrame, rel: str):
+    # part와 같은 순서의 행 번호로 bigram index 기록 (임시 파일 → atomic rename)
+    path = _store_path(rel)
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, **build_gram_index(search_text(df)))
+        _fsync_file(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+# -----------------------------
+# Category 사전 (버전별 고정 순서)
+# -----------------------------
+def clean_categories(values) -> list[str]:
+    # 결측/빈 값을 뺀 정렬된 category 목록
+    out = set()
+    for v in values:
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            continue
+        v = str(v).strip()
+        if v not in NULL_TOKENS:
+            out.add(v)
+    return sorted(out)
+
+def _scan_categories(paths: list[str]) -> dict[str, list[str]]:
+    # category 사전이 없는 예전 버전: part들의 차원 컬럼 dictionary에서 구한다
+    found = {c: set() for c in DIM_COLS}
+    for p in paths:
+        names = pq.read_schema(p).names
+        cols = [c for c in DIM_COLS if c in names]
+        if not cols:
+            continue
+        t = pq.read_table(p, columns=cols)
+        for c in cols:
+            found[c].update(t.column(c).unique().to_pylist())
+    return {c: clean_categories(v) for c, v in found.items()}
+
+_CATEGORY_CACHE = {}
+
+def load_master_categories(entry: dict | None = None) -> dict[str, list[str]]:
+    """
+    버전별 category 사전 {컬럼: 정렬된 값 목록}
+    저장 시 master/_meta/cNNNNNN.json 으로 함께 기록되며, 로더는 이 순서로 category를 고정한다.
+    (사전 파일은 버전마다 새로 쓰고 수정하지 않으므로 파일 경로 기준으로 캐시)
+    """
+    if entry is None:
+        entry = load_master_manifest()
+    rel = entry.get("categories")
+    if rel and rel in _CATEGORY_CACHE:
+        return _CATEGORY_CACHE[rel]
+    if rel and os.path.exists(_store_path(rel)):
+        try:
+            with open(_store_path(rel), "r", encoding="utf-8") as f:
+                cats = json.load(f)
+            _CATEGORY_CACHE.clear()
+            _CATEGORY_CACHE[rel] = cats
+            return cats
+        except:
+            pass
+    paths = current_master_parts(entry)
+    return _scan_categories([p for p in paths if os.path.exists(p)])
+
+def apply_categories(df: pd.DataFrame, cats: dict[str, list[str]]) -> pd.DataFrame:
+    # 차원 컬럼을 고정된 category 순서로 맞춘다 (사전에 없는 값/빈 값은 NaN)
+    for c in DIM_COLS:
+        if c in df.columns and c in cats:
+            if isinstance(df[c].dtype, pd.CategoricalDtype):
+                # 순서 없는 category는 값 집합만 같으면 astype이 아무것도 안 하므로 순서를 직접 맞춘다
+                df[c] = df[c].cat.set_categories(cats[c])
+            else:
+                df[c] = df[c].astype(pd.CategoricalDtype(cats[c]))
+    return df
+
+# -----------------------------
+# Save / rollback / read
+# -----------------------------
+def _save_source(src):
+    """
+    저장 입력 → (content key, 행별 월 번호(연*12+월-1, 날짜 없음 -1), 월별 행 reader)
+    src: DataFrame 또는 stage_upload()가 만든 staging parquet 경로 목록
+    staging 입력은 key/월 계산용 컬럼만 batch 단위로 훑고, 실제 행은 월 partition 하나씩 읽는다.
+    """
+    def _month_no(dates: pd.Series) -> np.ndarray:
+        return (dates.dt.year * 12 + dates.dt.month - 1).fillna(-1).to_numpy(dtype=np.int64)
+
+    if isinstance(src, pd.DataFrame):
+        # prep을 거치지 않은 입력도 저장 전에 같은 정리 단계를 거친다 (로드 시 문자열 정리 없음)
+        src = normalize_master_like(src)
+        dates = parse_date_series(src["날짜"])
+        month_no = _month_no(dates)
+
+        def read_month(m):
+            sel = month_no == m
+            return src.loc[sel].assign(날짜=dates[sel])
+
+        return content_key(src), month_no, read_month
+
+    paths = list(src)
+    keys, month_no = [], []
+    for p in paths:
+        pf = pq.ParquetFile(p)
+        cols = [c for c in KEY_COLS if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=INGEST_CHUNK_ROWS, columns=cols):
+            b = batch.to_pandas()
+            keys.append(content_key(b))
+            month_no.append(_month_no(parse_date_series(b["날짜"])))
+    keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.uint64)
+    month_no = np.concatenate(month_no) if month_no else np.zeros(0, dtype=np.int64)
+
+    def read_month(m):
+        # 파일 순서 + 파일 안의 행 순서를 그대로 유지 → month_no == m 인 행과 1:1 대응
+        lo, hi = _month_bounds(m)
+        tables = [pq.read_table(p, filters=[("날짜", ">=", lo), ("날짜", "<", hi)]) for p in paths]
+        return pa.concat_tables(tables).to_pandas()
+
+    return keys, month_no, read_month
+
+def save_master_parquet(src, meta: dict, mode: str = "replace") -> dict:
+    """
+    새 master 버전 저장
+    - src: DataFrame 또는 staging parquet 경로 목록(stage_upload 결과)
+    - mode="replace": 업로드 내용만으로 master 전체 교체
+    - mode="append" : 기존 master와 중복(content key)을 뺀 행만 새 part로 추가
+      master = 보관된 part들의 합집합이라 기존 이력은 다시 쓰지 않는다.
+    part는 월 partition 하나씩 읽어서 임시 파일 → fsync → rename 으로 기록하고,
+    마지막에 manifest(master.meta)를 atomic 교체해 현재 버전으로 지정한다. 읽는 쪽은 저장 중에도 막히지 않는다.
+    """
+    ensure_data_dir()
+    os.makedirs(MASTER_STORE_DIR, exist_ok=True)
+    with _SAVE_LOCK:
+        t0 = time.perf_counter()
+        manifest = load_master_manifest()
+        history = manifest.get("history", [])
+        version = max([h.get("version", 0) for h in history] + [0]) + 1
+
+        keys, month_no, read_month = _save_source(src)
+        base_parts, base_rows = [], 0
+        if mode == "append":
+            base_parts = entry_parts(manifest)
+            if not base_parts and os.path.exists(MASTER_PARQUET):
+                base_parts = [os.path.basename(MASTER_PARQUET)]
+            base_rows = int(sum(pq.read_metadata(_store_path(p)).num_rows for p in base_parts))
+            # key에 날짜가 들어가므로 업로드에 있는 달의 part(+월 정보 없는 예전 part의 그 달 행)만 비교
+            months = np.unique(month_no[month_no >= 0])
+            labels = {month_label(m) for m in months}
+            scoped = [p for p in base_parts if part_month(p) is None or part_month(p) in labels]
+            existing = (
+                np.concatenate([_part_keys(p, months) for p in scoped])
+                if scoped and len(months) else np.zeros(0, dtype=np.uint64)
+            )
+            keep = new_rows_mask(keys, existing)
+        else:
+            keep = np.ones(len(keys), dtype=bool)
+        # 날짜가 없는 행은 저장하지 않는다
+        keep &= month_no >= 0
+        t_dedup = time.perf_counter() - t0
+
+        added = int(keep.sum())
+        skipped = int(len(keys) - added)
+        if mode == "append" and added == 0:
+            return {**manifest, "added_rows": 0, "skipped_rows": skipped}
+
+        # 월 partition 단위로 나눠 기록: master/월=YYYY-MM/pNNNNNN.parquet
+        new_parts, merged, timings = [], set(), {}
+        new_vals = {c: set() for c in DIM_COLS}
+        lo, hi = None, None
+        for m in np.unique(month_no[keep]):
+            sel = month_no == m
+            g = read_month(m)[keep[sel]]
+            if KEYWORD_COL not in g.columns:
+                # prep을 거치지 않은 입력이면 여기서 키워드 bitmask 계산
+                g = g.assign(**{KEYWORD_COL: keyword_bits(g[MEMO_COL]) if MEMO_COL in g.columns else np.uint16(0)})
+            g = g.assign(_key=keys[sel & keep], 날짜=parse_date_series(g["날짜"]))
+            same = [p for p in base_parts if part_month(p) == month_label(m)]
+            if len(same) >= MONTH_PARTS_MAX:
+                # 그 달 part가 많이 쌓였으면 이번 추가분과 합쳐 하나로 다시 쓴다 (비용은 그 달 크기만큼)
+                g = pd.concat([_read_full_part(p) for p in same] + [g], ignore_index=True)
+                merged.update(same)
+            g = g.sort_values("날짜", kind="stable").reset_index(drop=True)
+
+            rel = os.path.join("master", f"월={month_label(m)}", f"p{version:06d}.parquet")
+            for k, v in _write_part(g, rel).items():
+                timings[k] = round(timings.get(k, 0) + v, 3)
+            tc = time.perf_counter()
+            _write_part(build_cube(g.drop(columns=["_key"])), part_cube_path(rel))
+            timings["cube"] = round(timings.get("cube", 0) + time.perf_counter() - tc, 3)
+            tg = time.perf_counter()
+            _write_grams(g, part_grams_path(rel))
+            timings["index"] = round(timings.get("index", 0) + time.perf_counter() - tg, 3)
+            new_parts.append(rel)
+
+            for c in DIM_COLS:
+                if c in g.columns:
+                    new_vals[c].update(g[c].dropna().unique().tolist())
+            lo = g["날짜"].iloc[0] if lo is None else min(lo, g["날짜"].iloc[0])
+            hi = g["날짜"].iloc[-1] if hi is None else max(hi, g["날짜"].iloc[-1])
+            del g
+        timings["dedup"] = round(t_dedup, 3)
+
+        parts = [p for p in base_parts if p not in merged] + new_parts
+
+        # category 사전: 기존 버전 사전 ∪ 이번에 추가된 값 (정렬 고정)
+        base_cats = load_master_categories(manifest) if base_parts else {}
+        cats = {c: clean_categories(list(base_cats.get(c, [])) + list(new_vals[c])) for c in DIM_COLS}
+        cats_rel = os.path.join("master", "_meta", f"c{version:06d}.json")
+        os.makedirs(os.path.dirname(_store_path(cats_rel)), exist_ok=True)
+        atomic_write_json(_store_path(cats_rel), cats)
+
+        if base_parts:
+            b_lo, b_hi = master_date_bounds(manifest)
+            lo = min([x for x in [lo, b_lo] if x is not None and pd.notna(x)], default=None)
+            hi = max([x for x in [hi, b_hi] if x is not None and pd.notna(x)], default=None)
+        entry = {
+            **meta,
+            "version": version,
+            "mode": mode,
+            "parts": parts,
+            "categories": cats_rel,
+            "rows": base_rows + added,
+            "added_rows": added,
+            "skipped_rows": skipped,
+            "date_min": lo.strftime("%Y-%m-%d %H:%M:%S") if lo is not None else None,
+            "date_max": hi.strftime("%Y-%m-%d %H:%M:%S") if hi is not None else None,
+            "bytes": int(sum(os.path.getsize(_store_path(p)) for p in parts)),
+            "save_seconds": round(time.perf_counter() - t0, 3),
+            "timings": timings,
+        }
+        history = [entry] + history
+        manifest = _publish(entry, history)
+        _prune_snapshots(manifest["history"])
+    return manifest
+
+def rollback_master(version: int) -> dict:
+    # 보관 중인 버전으로 manifest만 바꿔치기 (데이터 재업로드/재기록 없음)
+    with _SAVE_LOCK:
+        history = list_master_versions()
+        target = next((h for h in history if h.get("version") == version), None)
+        if target is None:
+            raise ValueError(f"보관 중인 버전이 아닙니다: v{version}")
+        missing = [p for p in entry_parts(target) if not os.path.exists(_store_path(p))]
+        if missing:
+            raise ValueError(f"스냅샷 파일이 없습니다: {missing}")
+        return _publish(target, history)
+
+def current_master_parts(entry: dict | None = None) -> list[str]:
+    # 현재 버전의 part 파일 경로 목록
+    if entry is None:
+        entry = load_master_manifest()
+    parts = entry_parts(entry)
+    if parts:
+        return [_store_path(p) for p in parts]
+
+    # 예전 단일 파일 구조(master.parquet / master.xlsx) 호환
+    if not os.path.exists(MASTER_PARQUET) and os.path.exists(MASTER_XLSX):
+        try:
+            legacy = normalize_master_like(pd.read_excel(MASTER_XLSX))
+            write_master_table(legacy, MASTER_PARQUET)
+        except:
+            return []
+    if os.path.exists(MASTER_PARQUET):
+        return [MASTER_PARQUET]
+    return []
+
+def master_date_bounds(entry: dict | None = None):
+    """
+    현재 master의 날짜 (min, max)
+    manifest에 기록된 값을 쓰고, 없으면(예전 형식) parquet 통계에서 구한다. 데이터는 읽지 않음.
+    """
+    if entry is None:
+        entry = load_master_manifest()
+    if entry.get("date_min") and entry.get("date_max"):
+        return pd.Timestamp(entry["date_min"]), pd.Timestamp(entry["date_max"])
+    paths = current_master_parts(entry)
+    ranges = [_part_date_range(p) for p in paths if os.path.exists(p)]
+    los = [r[0] for r in ranges if r[0] is not None]
+    his = [r[1] for r in ranges if r[1] is not None]
+    if not los or not his:
+        return None, None
+    return min(los), max(his)
+
+def _read_part_table(path: str, columns=None, filters=None, empty: bool = False) -> pa.Table:
+    schema = pq.read_schema(path)
+    cols = [c for c in (columns or schema.names) if c in schema.names and c != "_key"]
+    if empty:
+        t = schema.empty_table().select(cols)
+    else:
+        t = pq.read_table(path, columns=cols, filters=filters)
+        if (schema.metadata or {}).get(CLEAN_META_KEY) != b"1":
+            t = _clean_legacy_table(t)
+    return _normalize_table(t)
+
+def _clean_legacy_table(t: pa.Table) -> pa.Table:
+    # 정리 표시가 없는 예전 part: 텍스트/차원 컬럼을 Arrow에서 정리
+    # (차원 컬럼을 그대로 두면 ' 유선' 같은 값이 category 사전에 없어 NaN이 된다)
+    for c in TEXT_CANDIDATES + DIM_COLS:
+        if c not in t.column_names:
+            continue
+        i = t.column_names.index(c)
+        col = t.column(c)
+        is_dict = pa.types.is_dictionary(col.type)
+        if is_dict:
+            # trim 후 사전 값이 겹칠 수 있어 풀어서 정리한 뒤 다시 인코딩
+            col = col.cast(pa.string())
+        if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            col = _clean_text_array(col)
+            if c in DIM_COLS:
+                col = pc.dictionary_encode(col)
+            t = t.set_column(i, c, col)
+    return t
+
+def _normalize_table(t: pa.Table) -> pa.Table:
+    # part마다 dictionary/string 타입이 다를 수 있어 맞춰서 이어붙인다
+    fields = []
+    for f in t.schema:
+        if f.name in DIM_COLS:
+            fields.append(pa.field(f.name, pa.dictionary(pa.int32(), pa.string())))
+        elif pa.types.is_timestamp(f.type):
+            fields.append(pa.field(f.name, pa.timestamp("ns")))
+        elif pa.types.is_large_string(f.type) or pa.types.is_string(f.type):
+            fields.append(pa.field(f.name, pa.string()))
+        else:
+            fields.append(f)
+    return t.cast(pa.schema(fields))
+
+def _select_parts(paths: list[str], start=None, end=None) -> list[str]:
+    # 기간과 겹치는 월 partition만 (월 정보가 없는 예전 part는 항상 포함)
+    out = []
+    for p in paths:
+        m = part_month(p)
+        if m is not None:
+            if start is not None and m < start.strftime("%Y-%m"):
+                continue
+            if end is not None and m > end.strftime("%Y-%m"):
+                continue
+        out.append(p)
+    return out
+
+def _read_parts(paths: list[str], cats: dict, columns=None, filters=None) -> pd.DataFrame:
+    if not paths:
+        return pd.DataFrame()
+    tables = [_read_part_table(p, columns, filters) for p in paths]
+    table = pa.concat_tables(tables, promote_options="default") if len(tables) > 1 else tables[0]
+    return apply_categories(table.to_pandas(), cats)
+
+def read_master(columns=None, start=None, end=None, channels=None) -> pd.DataFrame:
+    """
+    manifest가 가리키는 현재 버전(part 합집합) 읽기 (없으면 빈 DataFrame)
+    start/end를 주면 겹치는 월 partition 파일만 열고, 그 안에서도 기간 밖 행은 읽지 않는다.
+    channels를 주면 해당 채널 행만 읽는다.
+    """
     ensure_data_dir()
-    with open(MASTER_XLSX, "wb") as f:
-        f.write(master_bytes)
-    with open(MASTER_META, "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    manifest = load_master_manifest()
+    paths = [p for p in current_master_parts(manifest) if os.path.exists(p)]
+    if not paths:
+        return pd.DataFrame()
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    filters = []
+    if start is not None:
+        filters.append(("날짜", ">=", start))
+    if end is not None:
+        filters.append(("날짜", "<=", end))
+    if channels:
+        filters.append(("채널", "in", list(channels)))
+
+    cats = load_master_categories(manifest)
+    selected = _select_parts(paths, start, end)
+    if not selected:
+        # 기간에 해당하는 partition이 없으면 컬럼만 있는 빈 결과
+        return apply_categories(_read_part_table(paths[0], columns, empty=True).to_pandas(), cats)
+    return _read_parts(selected, cats, columns, filters or None)
+
+# -----------------------------
+# Process-wide master cache (모든 페이지/세션 공용)
+# -----------------------------
+# kind("master" | "cube") → {"version", "frame", "parts"}
+_STORE = {}
+_STORE_LOCK = threading.Lock()
+# 공용 frame 세대 번호 (프로세스 전체에서 하나씩 증가 → 롤백 후 같은 버전을 다시 올려도 (버전, 세대)가 겹치지 않음)
+_STORE_GEN = itertools.count(1)
+
+def master_version(entry: dict | None = None) -> str:
+    # 캐시 key: manifest 버전 (예전 형식은 파일 mtime). 롤백하면 예전 버전 번호로 돌아간다
+    if entry is None:
+        entry = load_master_manifest()
+    if entry.get("version"):
+        return f"v{entry['version']}"
+    sig = []
+    for p in current_master_parts(entry):
+        try:
+            sig.append(f"{os.path.basename(p)}:{os.stat(p).st_mtime_ns}")
+        except OSError:
+            pass
+    return "legacy:" + ",".join(sig)
+
+def _prepare_master(df: pd.DataFrame) -> pd.DataFrame:
+    # 로드 시 1회만 하는 정리 (날짜 없는 행 제거, 파생 컬럼). 문자열 정리는 저장 시 끝나 있다
+    miss = [c for c in REQUIRED_COLS + ["채널"] if c not in df.columns]
+    if miss:
+        raise ValueError(f"master에 필수 컬럼이 없습니다: {miss}")
+
+    if df["날짜"].isna().any():
+        df = df[df["날짜"].notna()].copy()
+    df["월"] = df["날짜"].dt.to_period("M").dt.to_timestamp()
+    # 키워드 bitmask가 없는 예전 part 행은 로드 시 한 번 계산
+    text_col = next((c for c in TEXT_CANDIDATES if c in df.columns), None)
+    kw = df[KEYWORD_COL] if KEYWORD_COL in df.columns else pd.Series(np.nan, index=df.index)
+    if kw.isna().any():
+        miss = kw.isna().to_numpy()
+        filled = kw.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        if text_col is not None:
+            filled[miss] = keyword_bits(df[text_col][miss])
+        else:
+            filled[miss] = 0
+        kw = pd.Series(filled, index=df.index)
+    df[KEYWORD_COL] = kw.astype(np.uint16)
+    return df
+
+def _window(frame: pd.DataFrame, date_col: str, start=None, end=None) -> pd.DataFrame:
+    # 날짜순 정렬된 frame에서 기간 구간만 잘라 view로 돌려준다 (복사 없음)
+    if frame.empty or (start is None and end is None):
+        return frame
+    dates = frame[date_col].to_numpy()
+    lo = 0 if start is None else int(np.searchsorted(dates, start.to_datetime64(), side="left"))
+    hi = len(frame) if end is None else int(np.searchsorted(dates, end.to_datetime64(), side="right"))
+    return frame.iloc[lo:hi]
+
+def _cached_window(kind: str, reader, date_col: str, start=None, end=None):
+    """
+    버전별 공용 frame 하나를 유지하면서 필요한 월 partition만 읽어 붙이고 기간 구간 view를 돌려준다.
+    reader(paths, cats) → 해당 part들의 frame (paths가 비면 컬럼만 있는 빈 frame)
+    반환: (view, (버전, 세대)) — 세대는 공용 frame을 다시 만들 때마다 새 번호 (프로세스 전체에서 재사용 없음)
+    """
+    manifest = load_master_manifest()
+    version = master_version(manifest)
+    paths = [p for p in current_master_parts(manifest) if os.path.exists(p)]
+    if not paths:
+        return pd.DataFrame(), (version, 0)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    with _STORE_LOCK:
+        cache = _STORE.get(kind)
+        if cache is None or cache["version"] != version:
+            # 새 버전이면 이전 사본은 버린다 (프로세스당 한 벌)
+            cache = _STORE[kind] = {"version": version, "frame": None, "parts": frozenset(), "gen": next(_STORE_GEN), "ids": {}}
+
+        need = set(_select_parts(paths, start, end))
+        missing = need - cache["parts"]
+        if missing or cache["frame"] is None:
+            cats = load_master_categories(manifest)
+            old = cache["frame"]
+            if not missing:
+                frame = reader([paths[0]], cats, empty=True)
+            else:
+                add = reader(sorted(missing), cats)
+                if "_src" in add.columns:
+                    # reader는 넘겨받은 목록 안의 순번으로 적으므로, 버전 공용 part 번호로 바꾼다
+                    gid = np.array([cache["ids"].setdefault(p, len(cache["ids"])) for p in sorted(missing)], dtype=np.int64)
+                    src = add["_src"].to_numpy()
+                    add["_src"] = (gid[src >> 32] << 32) | (src & 0xFFFFFFFF)
+                frame = add if old is None or old.empty else pd.concat([old, add], ignore_index=True)
+            frame = frame.sort_values(date_col, kind="stable", ignore_index=True)
+            cache.update(frame=frame, parts=cache["parts"] | missing, gen=next(_STORE_GEN))
+        frame, key = cache["frame"], (version, cache["gen"])
+
+    return _window(frame, date_col, start, end), key
+
+def _master_reader(paths: list[str], cats: dict, empty: bool = False) -> pd.DataFrame:
+    if empty:
+        return _prepare_master(apply_categories(_read_part_table(paths[0], empty=True).to_pandas(), cats))
+    df = _read_parts(paths, cats)
+    # _src = (paths 안의 순번 << 32) | part 안의 행 번호 — 검색 index(part 행 번호)와 공용 frame 위치를 잇는다
+    sizes = [pq.read_metadata(p).num_rows for p in paths]
+    part_no = np.repeat(np.arange(len(paths), dtype=np.int64), sizes)
+    local = np.arange(len(part_no), dtype=np.int64) - np.repeat(np.cumsum([0] + sizes[:-1]), sizes)
+    df["_src"] = (part_no << 32) | local
+    return _prepare_master(df)
+
+def load_master(start=None, end=None) -> pd.DataFrame:
+    """
+    프로세스 공용 master (대시보드/검색 페이지, 모든 세션이 같은 사본 하나를 공유)
+    - master 버전별로 한 벌만 메모리에 올리고, 요청 기간에 필요한 월 partition만 읽어 붙인다.
+    - 날짜순 정렬된 사본에서 기간 구간을 잘라(view) 돌려주므로 호출마다 복사/역직렬화가 없다.
+    - 돌려받은 DataFrame의 값은 수정하지 말 것 (필요하면 필터/copy 후 사용)
+    """
+    return _cached_window("master", _master_reader, "날짜", start, end)[0]
+
+def _prepare_cube(cube: pd.DataFrame) -> pd.DataFrame:
+    # 차트용 파생 컬럼은 로드 시 1회만 (rerun마다 dt 변환/복사 없음)
+    cube["월"] = cube["일"].dt.to_period("M").dt.to_timestamp()
+    cube["요일"] = cube["일"].dt.weekday.astype("int8")
+    return cube
+
+def _cube_reader(paths: list[str], cats: dict, empty: bool = False) -> pd.DataFrame:
+    if empty:
+        return _prepare_cube(build_cube(_master_reader(paths, cats, empty=True)))
+    tables = []
+    for p in paths:
+        cp = part_cube_path(p)
+        if os.path.exists(cp):
+            tables.append(_read_part_table(cp))
+        else:
+            # cube 없이 저장된 예전 part는 원본에서 한 번 집계
+            cube = build_cube(_master_reader([p], cats))
+            tables.append(_normalize_table(pa.Table.from_pandas(cube, preserve_index=False)))
+    table = pa.concat_tables(tables, promote_options="default") if len(tables) > 1 else tables[0]
+    return _prepare_cube(apply_categories(table.to_pandas(), cats))
+
+def load_cube(start=None, end=None) -> pd.DataFrame:
+    # 프로세스 공용 집계 cube (일/시간/채널/기업명/대·중·소분류별 건수)의 기간 구간 view
+    if start is not None:
+        start = pd.Timestamp(start).floor("D")
+    return _cached_window("cube", _cube_reader, "일", start, end)[0]
+
+# -----------------------------
+# 상담메모 키워드 묶음 (요약 카드용) — 한 번의 scan으로 모든 묶음 판정
+# -----------------------------
+KEYWORD_GROUPS = [
+    ("로그인", ["로그인", "로그인불가"]),
+    ("비밀번호", ["비밀번호", "패스워드", "임시비밀번호", "비번"]),
+    ("아이디", ["아이디"]),
+    ("수강신청", ["수강신청", "신청방법", "신청"]),
+    ("취소", ["취소", "수강취소"]),
+    ("환불", ["환불"]),
+    ("결제", ["결제", "자동결제"]),
+    ("진도", ["진도"]),
+    ("수료", ["수료", "수료증", "수료확정"]),
+    ("재생", ["재생", "영상", "동영상"]),
+    ("오류", ["오류", "에러", "장애", "불가"]),
+    ("출석", ["출석"]),
+    ("시험", ["시험", "평가"]),
+    ("모바일", ["모바일", "앱"]),
+]
+KEYWORD_LABELS = [label for label, _ in KEYWORD_GROUPS]
+
+# 묶음별 패턴 (소문자 기준 alternation)
+_KEYWORD_PATTERNS = ["|".join(re.escape(k.lower()) for k in kws) for _, kws in KEYWORD_GROUPS]
+
+def keyword_matrix(texts: pd.Series) -> np.ndarray:
+    """
+    텍스트 → (행 × 키워드 묶음) bool 행렬 (대소문자 무시)
+    묶음 단위 판정: 묶음 안 키워드 중 하나라도 있으면 True (행당 묶음별 최대 1건)
+    - 같은 문구는 한 번만 판정 (factorize 후 고유 문구만)
+    - 소문자 변환 1회 + 묶음별 Arrow(RE2) 판정 — Python 행 단위 loop 없음
+    """
+    codes, uniq = pd.factorize(texts.astype("string"))
+    mat = np.zeros((len(uniq) + 1, len(KEYWORD_GROUPS)), dtype=bool)
+    if len(uniq):
+        low = pc.utf8_lower(pa.array(np.asarray(uniq, dtype=object), type=pa.string()))
+        for i, pat in enumerate(_KEYWORD_PATTERNS):
+            mat[:len(uniq), i] = pc.match_substring_regex(low, pat).to_numpy(zero_copy_only=False)
+    # 결측(code -1)은 마지막 빈 행
+    return mat[codes]
+
+KEYWORD_COL = "_kw"
+
+def keyword_bits(texts: pd.Series) -> np.ndarray:
+    # 행별 키워드 묶음 bitmask (묶음 i → bit i, uint16). 관리자 업로드(prep) 시 계산해 master에 함께 저장
+    mat = keyword_matrix(texts)
+    return (mat.astype(np.uint16) << np.arange(len(KEYWORD_GROUPS), dtype=np.uint16)).sum(axis=1, dtype=np.uint16)
+
+def count_keyword_bits(bits: np.ndarray) -> np.ndarray:
+    # bitmask 배열 → 묶음별 행 수 (값별 bincount 후 bit마다 합산, 텍스트 접근 없음)
+    n = len(KEYWORD_GROUPS)
+    bc = np.bincount(np.asarray(bits, dtype=np.int64), minlength=1 << n)
+    values = np.arange(len(bc))
+    return np.array([bc[(values >> i) & 1 == 1].sum() for i in range(n)], dtype=np.int64)
+
+# -----------------------------
+# 메모리 측정 (VOC_TRACE_MEM=1 일 때만 rerun별 peak 기록)
+# -----------------------------
+MEM_TRACE = os.environ.get("VOC_TRACE_MEM", "0") not in ("", "0")
+MEM_BUDGET_MB = float(os.environ.get("VOC_MEM_BUDGET_MB", "64"))
+
+def mem_trace_start():
+    if not MEM_TRACE:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+def mem_trace_peak() -> float | None:
+    # 마지막 mem_trace_start 이후 peak (MB), 측정 중이 아니면 None
+    if not MEM_TRACE or not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+
+# -----------------------------
+# Filter engine (조건별 행 위치 memoization)
+# -----------------------------
+FILTER_DIMS = ["채널", "기업명", "대분류", "중분류", "소분류"]
+FILTER_CACHE_SIZE = 64
+_FILTER_CACHE = OrderedDict()
+_FILTER_LOCK = threading.Lock()
+
+def _lru_get(cache: OrderedDict, key):
+    with _FILTER_LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _lru_put(cache: OrderedDict, key, value, size: int):
+    with _FILTER_LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+def _filter_get(key):
+    return _lru_get(_FILTER_CACHE, key)
+
+def _filter_put(key, idx: np.ndarray):
+    idx.setflags(write=False)
+    _lru_put(_FILTER_CACHE, key, idx, FILTER_CACHE_SIZE)
+
+def _refine(frame: pd.DataFrame, idx: np.ndarray, col: str, value) -> np.ndarray:
+    # 부모 결과(idx) 안에서만 한 차원 조건을 더 거른다 (category면 정수 code 비교)
+    s = frame[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = s.cat.categories
+        if value not in cats:
+            return idx[:0]
+        return idx[s.array.codes[idx] == cats.get_loc(value)]
+    return idx[s.to_numpy()[idx] == value]
+
+def _filter_idx(frame: pd.DataFrame, base: tuple, dims: tuple) -> np.ndarray:
+    key = base + dims
+    idx = _filter_get(key)
+    if idx is not None:
+        return idx
+
+    active = [i for i, v in enumerate(dims) if v != "전체"]
+    if not active:
+        idx = np.arange(len(frame), dtype=np.int64)
+    else:
+        # 한 차원만 다른 부모가 캐시에 있으면 그 결과에서 해당 차원만 더 거른다 (drill-down)
+        parent_i = next(
+            (i for i in reversed(active) if _filter_get(base + dims[:i] + ("전체",) + dims[i + 1:]) is not None),
+            active[-1],
+        )
+        parent = _filter_idx(frame, base, dims[:parent_i] + ("전체",) + dims[parent_i + 1:])
+        idx = _refine(frame, parent, FILTER_DIMS[parent_i], dims[parent_i])
+    _filter_put(key, idx)
+    return idx
+
+def filter_window(kind: str, start=None, end=None, **selected):
+    """
+    기간 + 채널/기업명/대·중·소분류 조건으로 거른 결과
+    반환: (기간 view, 조건에 맞는 행 위치 배열)  — 행 위치는 view 기준 (frame.iloc[idx])
+    key = (kind, master 버전, 기간, 조건) 으로 LRU 캐시하므로 같은 조건의 rerun은 바로 재사용하고,
+    조건 하나만 추가된 경우 부모 결과 안에서만 다시 거른다.
+    selected 키: 채널/기업명/대분류/중분류/소분류 (없거나 "전체"면 조건 없음)
+    """
+    frame, base = _filter_base(kind, start, end)
+    if frame.empty:
+        return frame, np.zeros(0, dtype=np.int64)
+    dims = tuple(str(selected.get(c, "전체") or "전체") for c in FILTER_DIMS)
+    return frame, _filter_idx(frame, base, dims)
+
+def _filter_base(kind: str, start=None, end=None):
+    # (기간 view, 캐시 key 앞부분) — key에 store 세대까지 넣어 행 위치가 어긋나지 않게 한다
+    if kind == "cube":
+        start = pd.Timestamp(start).floor("D") if start is not None else None
+        frame, store_key = _cached_window("cube", _cube_reader, "일", start, end)
+    else:
+        frame, store_key = _cached_window("master", _master_reader, "날짜", start, end)
+    return frame, (kind, store_key, str(start), str(end))
+
+# -----------------------------
+# 채널별 문의 요약 (요약 카드 3개를 한 번에)
+# -----------------------------
+# 중/소분류 TOP에서 빼는 라벨
+SUMMARY_EXCLUDE = {"", "nan", "None", "NaN", "미분류", "안내사항없음", "자체해결", "_자체해결"}
+UNCLASSIFIED = "미분류"
+
+def _dim_codes(frame: pd.DataFrame, col: str, idx: np.ndarray) -> tuple[np.ndarray, pd.Index]:
+    # 선택 행의 category code(결측 -1, category 수에 맞는 작은 정수형 그대로)와 category 목록
+    s = frame[col]
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    return s.array.codes[idx], s.cat.categories
+
+def _top_labels(codes: np.ndarray, counts: np.ndarray, cats: pd.Index, n: int) -> list[tuple[str, int]]:
+    # code별 건수 → 제외 라벨을 뺀 상위 n개 (라벨, 건수)
+    tot = np.bincount(codes[codes >= 0], weights=counts[codes >= 0], minlength=len(cats))
+    out = []
+    for c in np.argsort(-tot, kind="stable"):
+        if tot[c] <= 0 or len(out) >= n:
+            break
+        label = str(cats[c])
+        if label.strip() not in SUMMARY_EXCLUDE:
+            out.append((label, int(tot[c])))
+    return out
+
+# 셀 key 공간이 이 크기 이하이고 행 수의 PACKED_BINCOUNT_RATIO배 이하일 때만 bincount, 아니면 np.unique
+# (행 수보다 훨씬 큰 key 공간에 bincount 배열을 잡으면 건수 세기보다 할당이 더 크다)
+PACKED_BINCOUNT_MAX = 1 << 22
+PACKED_BINCOUNT_RATIO = 4
+
+def _count_packed(codes: list[np.ndarray], sizes: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    여러 category code 배열(결측 -1)을 int64 key 하나로 묶어 조합별 건수
+    key = ((c0 + 1) * (n1 + 1) + (c1 + 1)) * (n2 + 1) + ... — 문자열 생성 없음
+    반환: (등장한 key, 건수)
+    """
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    space = 1
+    for c, n in zip(codes, sizes):
+        # 임시 배열 없이 제자리 연산 (code는 작은 정수형 그대로 더한다)
+        key *= n + 1
+        key += c
+        key += 1
+        space *= n + 1
+    if space <= min(PACKED_BINCOUNT_MAX, PACKED_BINCOUNT_RATIO * len(key)):
+        bc = np.bincount(key, minlength=space)
+        keys = np.flatnonzero(bc)
+        return keys, bc[keys]
+    return np.unique(key, return_counts=True)
+
+def _unpack_codes(keys: np.ndarray, sizes: list[int]) -> list[np.ndarray]:
+    # _count_packed key → 차원별 code 배열 (결측 -1)
+    out = []
+    for n in reversed(sizes):
+        keys, r = np.divmod(keys, n + 1)
+        out.append(r - 1)
+    return out[::-1]
+
+def channel_summary(start=None, end=None, topn: int = 2, **selected) -> dict[str, dict]:
+    """
+    채널별 요약 카드 재료를 한 번에 계산 (채널 조건은 selected["채널"]을 따른다)
+    - 채널 × 대/중/소 category code를 int64 key로 묶어 bincount/np.unique 한 번
+      → 조합표(작음)에서 TOP 조합/중분류/소분류, 문자열은 1위 조합만 만든다
+    - 키워드 묶음: 채널별 _kw bitmask를 count_keyword_bits로 합산 (텍스트 접근 없음)
+    반환: {채널: {"rows", "top_combo", "top_cnt", "mids", "smalls", "keywords"}}
+    """
+    empty = {"rows": 0, "top_combo": "-", "top_cnt": 0, "mids": [], "smalls": [], "keywords": []}
+    out = {ch: dict(empty) for ch in CHANNELS}
+    frame, base = _filter_base("master", start, end)
+    if frame.empty:
+        return out
+    idx = _filter_idx(frame, base, tuple(str(selected.get(c, "전체") or "전체") for c in FILTER_DIMS))
+    if not len(idx):
+        return out
+
+    ch, ch_cats = _dim_codes(frame, "채널", idx)
+    levels = {c: _dim_codes(frame, c, idx) for c in ["대분류", "중분류", "소분류"]}
+    combo_keys, combo_cnt = _count_packed([ch] + [levels[c][0] for c in levels],
+                                          [len(ch_cats)] + [len(levels[c][1]) for c in levels])
+    # key → (채널, 대, 중, 소) code (결측 -1) — 조합 수만큼만 (행 수와 무관)
+    combo_codes = _unpack_codes(combo_keys, [len(ch_cats)] + [len(levels[c][1]) for c in levels])
+
+    bits = frame[KEYWORD_COL].to_numpy()[idx] if KEYWORD_COL in frame.columns else None
+
+    for code, label in enumerate(ch_cats):
+        if label not in out:
+            continue
+        mine = combo_codes[0] == code
+        if not mine.any():
+            continue
+        cnt = combo_cnt[mine]
+        win = int(np.argmax(cnt))
+        # 조합 문자열은 1위 조합만 만든다
+        parts = []
+        for lv, c in enumerate(["대분류", "중분류", "소분류"], start=1):
+            k = int(combo_codes[lv][mine][win])
+            parts.append(str(levels[c][1][k]).strip() if k >= 0 else UNCLASSIFIED)
+        keywords = []
+        if bits is not None:
+            per_bit = count_keyword_bits(bits[ch == code]).tolist()
+            keywords = sorted(
+                [(KEYWORD_LABELS[i], c) for i, c in enumerate(per_bit) if c > 0], key=lambda x: x[1], reverse=True
+            )[:topn]
+        out[label] = {
+            "rows": int(cnt.sum()),
+            "top_combo": " > ".join(parts),
+            "top_cnt": int(cnt[win]),
+            "mids": _top_labels(combo_codes[2][mine], cnt, levels["중분류"][1], topn),
+            "smalls": _top_labels(combo_codes[3][mine], cnt, levels["소분류"][1], topn),
+            "keywords": keywords,
+        }
+    return out
+
+# -----------------------------
+# 분류 tree (대→중→소, 노드별 건수) — 선택 박스 옵션용
+# -----------------------------
+TAXONOMY_CACHE_SIZE = 16
+_TAXONOMY_CACHE = OrderedDict()
+
+def _sorted_counts(d: dict) -> dict:
+    return {k: d[k] for k in sorted(d)}
+
+def taxonomy_index(start=None, end=None, channel: str = "전체") -> dict:
+    """
+    대→중→소 분류 tree + 노드별 건수 (master 버전 × 기간 × 채널 단위로 1회 구축, LRU 캐시)
+    - cube(조합별 건수)에서 만들므로 원본 행을 다시 훑지 않는다
+    - "전체"를 포함한 모든 상위 선택에 대한 옵션을 미리 만들어 둔다
+      {"대": {대: n}, "중": {대|"전체": {중: n}}, "소": {(대|"전체", 중|"전체"): {소: n}}}
+    옵션 조회는 taxonomy_options 사용
+    """
+    frame, base = _filter_base("cube", start, end)
+    key = base + (channel or "전체",)
+    tree = _lru_get(_TAXONOMY_CACHE, key)
+    if tree is not None:
+        return tree
+
+    big, mid, small = {}, {}, {}
+    if not frame.empty:
+        idx = _filter_idx(frame, base, (channel or "전체",) + ("전체",) * (len(FILTER_DIMS) - 1))
+        sub = frame.iloc[idx]
+        g = sub.groupby(["대분류", "중분류", "소분류"], observed=True, dropna=False)["건수"].sum()
+        for (b, m, sm), n in g.items():
+            n = int(n)
+            if n <= 0:
+                continue
+            # 상위가 비어 있어도 "전체" 아래 옵션에는 포함 (기존 dropna().unique()와 같은 범위)
+            bs = ["전체"] + ([b] if pd.notna(b) else [])
+            ms = ["전체"] + ([m] if pd.notna(m) else [])
+            if pd.notna(b):
+                big[b] = big.get(b, 0) + n
+            if pd.notna(m):
+                for bk in bs:
+                    node = mid.setdefault(bk, {})
+                    node[m] = node.get(m, 0) + n
+            if pd.notna(sm):
+                for pk in ((bk, mk) for bk in bs for mk in ms):
+                    node = small.setdefault(pk, {})
+                    node[sm] = node.get(sm, 0) + n
+
+    tree = {
+        "대": _sorted_counts(big),
+        "중": {k: _sorted_counts(v) for k, v in mid.items()},
+        "소": {k: _sorted_counts(v) for k, v in small.items()},
+    }
+    _lru_put(_TAXONOMY_CACHE, key, tree, TAXONOMY_CACHE_SIZE)
+    return tree
+
+def taxonomy_options(tree: dict, big: str = None, mid: str = None) -> dict:
+    """
+    선택 박스 옵션 {라벨: 건수} (라벨순)
+    - big/mid 모두 None → 대분류
+    - mid None → big 아래 중분류
+    - 그 외 → (big, mid) 아래 소분류
+    """
+    if big is None:
+        return tree["대"]
+    if mid is None:
+        return tree["중"].get(big, {})
+    return tree["소"].get((big, mid), {})
+
+def option_format(counts: dict):
+    # selectbox format_func: "라벨 (건수)" ("전체"는 그대로)
+    return lambda x: x if x == "전체" else f"{x} ({counts.get(x, 0):,})"
+
+# -----------------------------
+# 검색 (bigram postings 교집합 → 후보만 원문 확인)
+# -----------------------------
+GRAMS_CACHE_SIZE = 256
+_GRAMS_CACHE = OrderedDict()
+
+def _part_postings(store_key: tuple, path: str, gid: int, frame: pd.DataFrame, src: np.ndarray) -> dict:
+    """
+    part 하나의 bigram postings를 공용 frame 위치로 바꾼 것 (store 세대별 캐시)
+    저장 시 기록된 .grams.npz 가 있으면 읽고, 없으면(예전 part) 해당 행들로 한 번 만든다.
+    """
+    key = (store_key, path)
+    hit = _lru_get(_GRAMS_CACHE, key)
+    if hit is not None:
+        return hit
+
+    mine = np.flatnonzero((src >> 32) == gid)
+    gp = part_grams_path(path)
+    if os.path.exists(gp):
+        with np.load(gp) as z:
+            grams = {k: z[k] for k in ("keys", "offsets", "rows")}
+        local = src[mine] & 0xFFFFFFFF
+        rows = grams["rows"]
+        # part 행 번호 → 공용 frame 위치 (로드 시 빠진 행은 -1)
+        loc2pos = np.full(int(max(local.max(initial=-1), rows.max(initial=-1))) + 1, -1, dtype=np.int64)
+        loc2pos[local] = mine
+        pos = loc2pos[rows]
+    else:
+        grams = build_gram_index(search_text(frame.iloc[mine]))
+        pos = mine[grams["rows"]]
+    out = {"keys": grams["keys"], "offsets": grams["offsets"], "pos": pos.astype(np.int32)}
+    _lru_put(_GRAMS_CACHE, key, out, GRAMS_CACHE_SIZE)
+    return out
+
+def _gram_postings(store_key: tuple, grams: np.ndarray, lo: int, hi: int) -> list[np.ndarray] | None:
+    # 질의 bigram별 공용 frame 위치 목록 (lo~hi 구간만). store가 바뀌는 중이면 None
+    with _STORE_LOCK:
+        cache = _STORE.get("master")
+        if cache is None or (cache["version"], cache["gen"]) != store_key:
+            return None
+        store, ids = cache["frame"], dict(cache["ids"])
+    if "_src" not in store.columns:
+        return None
+    src = store["_src"].to_numpy()
+    if hi > lo:
+        dates = store["날짜"]
+        m_lo, m_hi = dates.iloc[lo].strftime("%Y-%m"), dates.iloc[hi - 1].strftime("%Y-%m")
+        # 기간과 겹치지 않는 월 partition은 건너뛴다
+        ids = {p: g for p, g in ids.items() if part_month(p) is None or m_lo <= part_month(p) <= m_hi}
+
+    out = []
+    for gram in grams:
+        hits = []
+        for path, gid in ids.items():
+            pp = _part_postings(store_key, path, gid, store, src)
+            i = int(np.searchsorted(pp["keys"], gram))
+            if i < len(pp["keys"]) and pp["keys"][i] == gram:
+                hits.append(pp["pos"][pp["offsets"][i]:pp["offsets"][i + 1]])
+        cur = np.concatenate(hits) if hits else np.zeros(0, dtype=np.int64)
+        out.append(np.unique(cur[(cur >= lo) & (cur < hi)]))
+    return out
+
+def _gram_candidates(store_key: tuple, grams: np.ndarray, lo: int, hi: int) -> np.ndarray | None:
+    # 질의 bigram을 모두 가진 공용 frame 위치
+    postings = _gram_postings(store_key, grams, lo, hi)
+    if postings is None:
+        return None
+    out = None
+    for cur in sorted(postings, key=len):
+        out = cur if out is None else np.intersect1d(out, cur, assume_unique=True)
+        if not len(out):
+            break
+    return out
+
+# 검색어 문법: 공백 = AND, 쉼표 = OR, "따옴표" = 구문 그대로, -단어 = 제외, 필드:단어 = 해당 필드만
+QUERY_FIELDS = {
+    "기업": "기업명", "기업명": "기업명",
+    "대": "대분류", "대분류": "대분류",
+    "중": "중분류", "중분류": "중분류",
+    "소": "소분류", "소분류": "소분류",
+    "메모": "메모", "상담메모": "메모",
+}
+_QUERY_TOKEN = re.compile(r'(,)|(-)?(?:([^\s,:"]+):)?(?:"([^"]*)"?|([^\s,"]+))')
+
+def parse_query(query: str) -> dict:
+    """
+    검색어 → {"groups": [[(필드, 단어), ...], ...], "exclude": [(필드, 단어), ...]}
+    - groups: 쉼표로 나뉜 OR 묶음, 묶음 안은 AND
+    - exclude: -단어 (질의 전체에서 제외)
+    - 필드 None = 상담메모 + 분류 + 기업명 전체, "메모" = 상담메모만
+    """
+    groups, cur, exclude = [], [], []
+    for m in _QUERY_TOKEN.finditer(str(query or "")):
+        comma, neg, field, phrase, word = m.groups()
+        if comma:
+            if cur:
+                groups.append(cur)
+            cur = []
+            continue
+        text = phrase if phrase is not None else word
+        if field and field not in QUERY_FIELDS:
+            # 모르는 접두어면 "a:b" 전체를 단어로 본다
+            text, field = f"{field}:{text}", None
+        text = (text or "").strip()
+        if not text:
+            continue
+        term = (QUERY_FIELDS.get(field), text)
+        (exclude if neg else cur).append(term)
+    if cur:
+        groups.append(cur)
+    return {"groups": groups, "exclude": exclude}
+
+def _term_hits(frame: pd.DataFrame, store_key: tuple, idx: np.ndarray, field: str | None, text: str) -> np.ndarray:
+    # idx(정렬된 행 위치) 중 단어가 들어 있는 행 → bool 배열. bigram 후보만 원문 확인
+    hit = np.zeros(len(idx), dtype=bool)
+    if not len(idx):
+        return hit
+    cand = idx
+    grams = query_grams(text)
+    if len(grams):
+        # 기간 view는 공용 frame의 연속 구간이라 index 라벨이 곧 공용 frame 위치
+        lo = int(frame.index[0])
+        found = _gram_candidates(store_key, grams, lo, lo + len(frame))
+        if found is not None:
+            cand = np.intersect1d(idx, found - lo, assume_unique=True)
+    if not len(cand):
+        return hit
+    sub = frame.iloc[cand]
+    if field is None:
+        s = search_text(sub)
+    else:
+        col = next((c for c in TEXT_CANDIDATES if c in sub.columns), None) if field == "메모" else field
+        if col is None:
+            return hit
+        s = sub[col].astype("string")
+    ok = s.str.contains(re.escape(text), case=False, na=False).to_numpy()
+    hit[np.searchsorted(idx, cand[ok])] = True
+    return hit
+
+def search_window(query: str, start=None, end=None, **selected):
+    """
+    기간/조건 + 검색어 (대소문자 무시 부분일치, 문법은 parse_query 참고)
+    1) filter engine으로 조건 행 위치
+    2) 단어마다 bigram postings 교집합으로 후보 축소 → 후보 행만 원문 확인
+    3) AND는 앞 단어 결과 안에서만, OR는 합집합, 제외는 차집합 (정렬된 행 위치 배열 집합 연산)
+    반환: (기간 view, 행 위치 배열) — filter_window와 같은 형식
+    """
+    frame, base = _filter_base("master", start, end)
+    if frame.empty:
+        return frame, np.zeros(0, dtype=np.int64)
+    idx = _filter_idx(frame, base, tuple(str(selected.get(c, "전체") or "전체") for c in FILTER_DIMS))
+    q = parse_query(query)
+    if not len(idx) or not (q["groups"] or q["exclude"]):
+        return frame, idx
+
+    if q["groups"]:
+        out = np.zeros(0, dtype=idx.dtype)
+        for group in q["groups"]:
+            sub = idx
+            for field, text in group:
+                sub = sub[_term_hits(frame, base[1], sub, field, text)]
+                if not len(sub):
+                    break
+            out = np.union1d(out, sub)
+    else:
+        out = idx
+    for field, text in q["exclude"]:
+        out = out[~_term_hits(frame, base[1], out, field, text)]
+    return frame, out
+
+# -----------------------------
+# 유사 검색 (오타/띄어쓰기 허용) — bigram 후보 축소 후 rapidfuzz로 일괄 채점
+# -----------------------------
+FUZZY_MIN_GRAM_SHARE = 0.5
+FUZZY_THRESHOLD = 75
+
+def fuzzy_search_window(query: str, start=None, end=None, threshold: float = FUZZY_THRESHOLD, **selected):
+    """
+    검색어 전체를 한 문구로 보고 유사도(partial_ratio, 0~100) threshold 이상인 행
+    1) 질의 bigram의 절반 이상을 가진 행만 후보 (오타 몇 글자는 통과, 나머지는 채점 안 함)
+    2) 소문자·공백 제거한 원문과 rapidfuzz process.cdist로 한 번에 채점 (C 구현, 행 단위 Python loop 없음)
+    반환: (기간 view, 행 위치 배열, 점수 배열) — 점수 내림차순, 같은 점수는 최신순
+    """
+    frame, base = _filter_base("master", start, end)
+    empty = np.zeros(0, dtype=np.int64)
+    if frame.empty:
+        return frame, empty, np.zeros(0, dtype=np.float32)
+    idx = _filter_idx(frame, base, tuple(str(selected.get(c, "전체") or "전체") for c in FILTER_DIMS))
+    q = _norm_search(str(query or "").replace('"', ""))
+    if not q or not len(idx):
+        return frame, empty, np.zeros(0, dtype=np.float32)
+
+    cand = idx
+    grams = query_grams(q)
+    if len(grams):
+        lo = int(frame.index[0])
+        postings = _gram_postings(base[1], grams, lo, lo + len(frame))
+        if postings is not None:
+            pos, cnt = np.unique(np.concatenate(postings), return_counts=True)
+            need = max(1, int(np.ceil(len(grams) * FUZZY_MIN_GRAM_SHARE)))
+            cand = np.intersect1d(idx, pos[cnt >= need] - lo, assume_unique=True)
+    if not len(cand):
+        return frame, empty, np.zeros(0, dtype=np.float32)
+
+    choices = search_text(frame.iloc[cand]).str.lower().str.replace(r"\s+", "", regex=True).tolist()
+    scores = process.cdist([q], choices, scorer=fuzz.partial_ratio, dtype=np.float32, workers=-1)[0]
+    keep = scores >= threshold
+    cand, scores = cand[keep], scores[keep]
+    # 점수 내림차순, 동점은 최신순 (공용 frame이 날짜순이라 위치가 클수록 최신)
+    order = np.lexsort((-cand, -scores))
+    return frame, cand[order], scores[order]
+
+def master_xlsx_bytes(df: pd.DataFrame | None = None) -> bytes:
+    # 다운로드용 xlsx (저장/로드 경로에서는 쓰지 않음)
+    if df is None:
+        df = read_master()
+    # 내부용 컬럼(_kw 등)은 내보내지 않는다
+    df = df[[c for c in df.columns if not str(c).startswith("_")]]
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine="openpyxl") as w:
+        df.to_excel(w, index=False, sheet_name="master")
+    return out.getvalue()
+
+# -----------------------------
+# 업로드 ingest (chunk 단위 → staging parquet)
+# -----------------------------
+# 업로드 파일은 chunk 단위로 읽고 정리해서 바로 staging parquet에 이어 쓴다.
+# 메모리 사용량은 파일 크기가 아니라 chunk 크기에 비례.
+INGEST_CHUNK_ROWS = 50_000
+STAGING_DIR = os.path.join(DATA_DIR, "staging")
+STAGING_MAX_AGE = 24 * 3600
+STAGING_COLS = REQUIRED_COLS + ["채널", MEMO_COL, KEYWORD_COL]
+STAGING_SCHEMA = pa.schema(
+    [("날짜", pa.timestamp("ns"))]
+    + [(c, pa.string()) for c in STAGING_COLS if c not in ("날짜", KEYWORD_COL)]
+    + [(KEYWORD_COL, pa.uint16())]
+)
+
+def iter_upload_chunks(file, name: str | None = None, chunk_rows: int = INGEST_CHUNK_ROWS, info: dict | None = None):
+    """
+    csv/xlsx 업로드 → 원본 DataFrame chunk
+    - csv : pd.read_csv(chunksize)
+    - xlsx: openpyxl read-only 모드로 행을 순서대로 읽어 chunk_rows씩 묶는다 (첫 시트, 첫 행 = 헤더)
+    - xls : openpyxl이 못 읽는 예전 형식이라 한 번에 읽는다
+    info를 넘기면 xlsx 시트에 기록된 전체 행 수(헤더 제외)를 info["total_rows"]에 채운다 (진행률 표시용).
+    """
+    name = (name or getattr(file, "name", "") or "").lower()
+    if name.endswith(".csv"):
+        yield from pd.read_csv(file, chunksize=chunk_rows)
+        return
+    if name.endswith(".xls"):
+        yield pd.read_excel(file)
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        if info is not None and ws.max_row:
+            info["total_rows"] = max(int(ws.max_row) - 1, 0)
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        cols = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        n, buf = len(cols), []
+        for r in rows:
+            if not any(v is not None for v in r):
+                continue
+            # read-only 모드는 행마다 길이가 다를 수 있어 헤더 길이에 맞춘다
+            buf.append(r[:n] if len(r) >= n else tuple(r) + (None,) * (n - len(r)))
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=cols)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=cols)
+    finally:
+        wb.close()
+
+def prep_master_chunk(df: pd.DataFrame, channel_name: str) -> pd.DataFrame:
+    """
+    업로드 chunk → master 형태 (REQUIRED_COLS + 채널 + 상담메모 + 키워드 bitmask)
+    normalize_master_like로 컬럼 표준화 후 필수 컬럼 확인, 날짜 없는 행 제외
+    """
+    df = normalize_master_like(df)
+
+    miss = [c for c in REQUIRED_COLS if c not in df.columns]
+    if miss:
+        raise ValueError(f"[{channel_name}] 필수 컬럼 누락: {miss} / 실제: {df.columns.tolist()}")
+
+    # 상담메모 / 상담내역 둘 다 대응
+    if MEMO_COL in df.columns:
+        memo = df[MEMO_COL]
+    elif "상담내역" in df.columns:
+        memo = df["상담내역"]
+    else:
+        memo = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    # 날짜 형식은 채널(export 시스템)별로 기억해 두고 다음 업로드부터 감지를 건너뛴다
+    dates = parse_date_series(df["날짜"], source=str(channel_name))
+    ok = dates.notna().to_numpy()
+    # 텍스트는 normalize_master_like에서 이미 정리됨 (결측은 NA 그대로 저장)
+    out = {"날짜": dates[ok]}
+    for c in ["기업명", "대분류", "중분류", "소분류"]:
+        out[c] = df[c][ok]
+    out["채널"] = pd.Series(str(channel_name).strip(), index=out["날짜"].index, dtype="string")
+    out[MEMO_COL] = memo[ok].astype("string")
+    out = pd.DataFrame(out)
+
+    # 상담메모 키워드 묶음 bitmask (요약 카드는 이 컬럼만 합산, 렌더링 시 텍스트를 훑지 않음)
+    out[KEYWORD_COL] = keyword_bits(out[MEMO_COL])
+    return out[STAGING_COLS]
+
+def _prune_staging(max_age: float = STAGING_MAX_AGE):
+    # 오래된 staging 파일 정리 (다른 세션이 쓰는 중인 최근 파일은 건드리지 않음)
+    now = time.time()
+    for name in os.listdir(STAGING_DIR):
+        path = os.path.join(STAGING_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _upload_size(file) -> int | None:
+    # 업로드 객체(BytesIO/UploadedFile) 또는 열린 파일의 전체 byte 수 (진행률 계산용)
+    if getattr(file, "size", None):
+        return file.size
+    if hasattr(file, "getbuffer"):
+        return len(file.getbuffer())
+    try:
+        return os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def stage_upload(file, channel_name: str, dest: str | None = None, chunk_rows: int = INGEST_CHUNK_ROWS,
+                 progress=None) -> dict:
+    """
+    업로드 파일 하나를 chunk 단위로 읽고 정리해서 staging parquet에 이어 쓴다.
+    (chunk마다 row group 하나, 임시 파일 → rename)
+    반환: {"path", "rows"(저장 대상 행 수), "raw_rows"(원본 행 수), "channel"}
+    save_master_parquet()에 path 목록을 넘기면 staging에서 월 단위로 읽어 저장한다.
+    progress(raw_rows, rows, fraction)는 chunk마다 호출된다 (fraction: 0~1, 모르면 None).
+    """
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    _prune_staging()
+    if dest is None:
+        dest = os.path.join(STAGING_DIR, f"{channel_name}-{os.getpid()}-{threading.get_ident()}.parquet")
+    tmp = _tmp_path(dest)
+    writer, rows, raw_rows = None, 0, 0
+    info = {}
+    size = _upload_size(file)
+    try:
+        for raw in iter_upload_chunks(file, chunk_rows=chunk_rows, info=info):
+            raw_rows += len(raw)
+            chunk = prep_master_chunk(raw, channel_name)
+            del raw
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, STAGING_SCHEMA, compression=PARQUET_COMPRESSION)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=STAGING_SCHEMA, preserve_index=False))
+            rows += len(chunk)
+            if progress is not None:
+                # xlsx는 시트 행 수 기준, csv는 읽은 byte 위치 기준
+                if info.get("total_rows"):
+                    frac = raw_rows / info["total_rows"]
+                elif size and hasattr(file, "tell"):
+                    frac = file.tell() / size
+                else:
+                    frac = None
+                progress(raw_rows, rows, min(frac, 1.0) if frac is not None else None)
+        if writer is None or raw_rows == 0:
+            raise ValueError(f"[{channel_name}] 파일이 비어있습니다.")
+        writer.close()
+        writer = None
+        os.replace(tmp, dest)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return {"path": dest, "rows": rows, "raw_rows": raw_rows, "channel": channel_name}
+
+def staging_preview(paths: list[str], n: int = 80) -> pd.DataFrame:
+    # staging 파일 앞쪽 n행만 (미리보기용, 파일 전체를 읽지 않음)
+    out, left = [], n
+    for p in paths:
+        for batch in pq.ParquetFile(p).iter_batches(batch_size=left):
+            out.append(batch.to_pandas())
+            left -= batch.num_rows
+            break
+        if left <= 0:
+            break
+    return pd.concat(out, ignore_index=True).head(n) if out else pd.DataFrame(columns=STAGING_COLS)
+
+# -----------------------------
+# 백그라운드 ingest (채널 파일별 job, 업로드 내용 hash로 캐시)
+# -----------------------------
+# 채널 파일마다 job 하나를 process pool에 올려 동시에 staging parquet로 정리한다. (xlsx 파싱은 CPU 작업)
+# worker에는 업로드 원본을 저장한 파일 경로만 넘기고, 결과도 staging parquet 경로로 돌려받는다.
+# (DataFrame을 pickle로 주고받지 않음) 진행률은 <key>.progress.json 파일로 전달.
+# 같은 내용의 파일은 hash가 같으므로 rerun/다른 세션에서도 다시 읽지 않는다.
+INGEST_WORKERS = max(1, min(len(CHANNELS), os.cpu_count() or 1))
+INGEST_JOB_CACHE = 16
+
+_INGEST_POOL = None
+_INGEST_JOBS = OrderedDict()
+_INGEST_LOCK = threading.Lock()
+
+def upload_hash(data) -> str:
+    # 업로드 원본 bytes 기준 (파일명/업로드 시각과 무관)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _ingest_pool(reset: bool = False) -> ProcessPoolExecutor:
+    # streamlit은 여러 thread로 도는 프로세스라 fork 대신 spawn으로 worker를 띄운다
+    global _INGEST_POOL
+    if _INGEST_POOL is None or reset:
+        _INGEST_POOL = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=mp.get_context("spawn"))
+    return _INGEST_POOL
+
+def _ingest_worker(src: str, channel_name: str, dest: str, progress_path: str) -> dict:
+    # worker 프로세스: 업로드 원본 파일 → staging parquet (결과는 경로와 건수만 반환)
+    def _progress(raw_rows, rows, fraction):
+        atomic_write_json(progress_path, {"raw_rows": raw_rows, "rows": rows, "fraction": fraction})
+
+    try:
+        with open(src, "rb") as f:
+            return stage_upload(f, channel_name, dest=dest, progress=_progress)
+    finally:
+        for p in (src, progress_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+def submit_ingest(file, channel_name: str) -> str:
+    """
+    업로드 파일 하나를 백그라운드 ingest job으로 등록하고 job key를 돌려준다.
+    업로드 원본은 staging에 파일로 저장해 두고 worker는 그 경로를 읽는다.
+    같은 채널·같은 내용의 job이 이미 있으면(진행 중/완료) 새로 만들지 않는다.
+    """
+    data = file.getbuffer() if hasattr(file, "getbuffer") else file.getvalue()
+    key = f"{channel_name}-{upload_hash(data)}"
+    with _INGEST_LOCK:
+        job = _INGEST_JOBS.get(key)
+        broken = False
+        if job is not None:
+            fut = job["future"]
+            exc = fut.exception() if fut.done() else None
+            # 파일 내용 때문에 실패한 job은 그대로 돌려주고, pool이 깨져서 실패한 job만 다시 돌린다
+            broken = isinstance(exc, BrokenExecutor)
+            if not fut.done() or os.path.exists(job["path"]) or (exc is not None and not broken):
+                _INGEST_JOBS.move_to_end(key)
+                return key
+        os.makedirs(STAGING_DIR, exist_ok=True)
+        name = getattr(file, "name", "") or ""
+        ext = os.path.splitext(name)[1].lower() or ".csv"
+        src = os.path.join(STAGING_DIR, f"{key}.upload{ext}")
+        tmp = _tmp_path(src)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, src)
+        job = {
+            "key": key,
+            "channel": channel_name,
+            "name": name,
+            "path": os.path.join(STAGING_DIR, f"{key}.parquet"),
+            "progress": os.path.join(STAGING_DIR, f"{key}.progress.json"),
+        }
+        args = (_ingest_worker, src, channel_name, job["path"], job["progress"])
+        try:
+            job["future"] = _ingest_pool(reset=broken).submit(*args)
+        except BrokenExecutor:
+            # worker가 비정상 종료돼 pool이 깨졌으면 새로 만든다
+            job["future"] = _ingest_pool(reset=True).submit(*args)
+        _INGEST_JOBS[key] = job
+        while len(_INGEST_JOBS) > INGEST_JOB_CACHE:
+            _INGEST_JOBS.popitem(last=False)
+    return key
+
+def ingest_status(key: str) -> dict:
+    """
+    job 상태 {"state": running/done/error/missing, "channel", "name", "path", "rows", "raw_rows", "fraction", "error"}
+    """
+    job = _INGEST_JOBS.get(key)
+    if job is None:
+        return {"state": "missing", "key": key}
+    out = {k: job[k] for k in ("key", "channel", "name", "path")}
+    out.update(raw_rows=0, rows=0, fraction=0.0)
+    fut = job["future"]
+    if not fut.done():
+        out["state"] = "running"
+        try:
+            with open(job["progress"], "r", encoding="utf-8") as f:
+                out.update(json.load(f))
+        except:
+            pass
+    elif fut.exception() is not None:
+        out.update(state="error", error=str(fut.exception()))
+    elif not os.path.exists(job["path"]):
+        # 완료됐지만 staging 파일이 정리된 경우 → 다시 등록해야 함
+        out["state"] = "missing"
+    else:
+        res = fut.result()
+        out.update(state="done", raw_rows=res["raw_rows"], rows=res["rows"], fraction=1.0)
+    return out